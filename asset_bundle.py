@@ -0,0 +1,194 @@
+"""Pre-decoded asset bundle for GeoMaster.
+
+Run this file once after changing anything under assets/ to decode every
+background, flag and sound effect into raw pixel and PCM data:
+
+    python asset_bundle.py
+
+The game memory-maps the resulting file at startup and wraps the pixel data
+in surfaces without copying, so a cold start mostly costs page faults instead
+of PNG/WebP/MP3 decoding. Entries whose source file changed after the bundle
+was built are ignored and the game falls back to loading the original file.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+BUNDLE_PATH = os.path.join('assets', 'geomaster.bundle')
+BUNDLE_MAGIC = b'GEOBNDL1'
+BUNDLE_ALIGN = 64  # Keep every blob cache-line aligned inside the mapping
+
+SCREEN_SIZE = (900, 600)
+FLAG_SIZES = [(100, 60)]  # main.FLAG_SIZE, the only size the game draws flags at
+
+BACKGROUND_PATHS = [
+    os.path.join('assets', 'background.png'),
+    os.path.join('assets', 'mainMenu_background.webp'),
+    os.path.join('assets', 'monument_background.webp'),
+    os.path.join('assets', 'flags_background.png'),
+    os.path.join('assets', 'endBackground.webp'),
+]
+
+SOUND_PATHS = [
+    os.path.join('assets', 'sounds', 'CorrectAnswer.mp3'),
+    os.path.join('assets', 'sounds', 'Incorrect.mp3'),
+    os.path.join('assets', 'sounds', 'Click.mp3'),
+    os.path.join('assets', 'sounds', 'Victory.mp3'),
+    os.path.join('assets', 'sounds', 'Sad2.mp3'),
+]
+
+
+def image_key(path, size):
+    return f'{os.path.normpath(path)}@{size[0]}x{size[1]}'
+
+
+def sound_key(path):
+    return os.path.normpath(path)
+
+
+class AssetBundle:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        if self._map[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a GeoMaster asset bundle")
+        header_start = len(BUNDLE_MAGIC)
+        (index_length,) = struct.unpack_from('<I', self._map, header_start)
+        index_start = header_start + 4
+        self.index = json.loads(bytes(self._map[index_start:index_start + index_length]))
+
+    def _entry(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        # Stale entries are skipped so edited assets are never shadowed
+        try:
+            if os.stat(entry['source']).st_mtime_ns != entry['mtime']:
+                return None
+        except OSError:
+            pass
+        return entry
+
+    def _blob(self, entry):
+        return self._view[entry['offset']:entry['offset'] + entry['length']]
+
+    def image(self, path, size):
+        import pygame
+
+        entry = self._entry(image_key(path, size))
+        if entry is None:
+            return None
+        # frombuffer shares the mapped pages instead of copying them
+        return pygame.image.frombuffer(self._blob(entry), tuple(entry['size']), entry['format'])
+
+    def sound(self, path):
+        import pygame
+
+        entry = self._entry(sound_key(path))
+        if entry is None or pygame.mixer.get_init() != tuple(entry['mixer']):
+            return None
+        return pygame.mixer.Sound(buffer=self._blob(entry))
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+def open_bundle(path=BUNDLE_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        return AssetBundle(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Warning: Could not open asset bundle {path}: {e}")
+        return None
+
+
+def _image_entries():
+    for path in BACKGROUND_PATHS:
+        yield path, SCREEN_SIZE
+
+    flags_dir = os.path.join('assets', 'Flags')
+    for name in sorted(os.listdir(flags_dir)):
+        if name.lower().endswith('.png'):
+            for size in FLAG_SIZES:
+                yield os.path.join(flags_dir, name), size
+
+
+def build_bundle(path=BUNDLE_PATH):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    import pygame
+
+    pygame.init()
+    index = {}
+    blobs = []
+
+    for source, size in _image_entries():
+        if not os.path.exists(source):
+            print(f"Skipping missing image {source}")
+            continue
+        image = pygame.transform.scale(pygame.image.load(source), size)
+        pixel_format = 'RGBA' if image.get_flags() & pygame.SRCALPHA else 'RGB'
+        index[image_key(source, size)] = {
+            'source': source,
+            'mtime': os.stat(source).st_mtime_ns,
+            'size': list(size),
+            'format': pixel_format,
+        }
+        blobs.append(pygame.image.tobytes(image, pixel_format))
+
+    mixer_format = pygame.mixer.get_init()
+    for source in SOUND_PATHS:
+        if not os.path.exists(source) or mixer_format is None:
+            print(f"Skipping sound {source}")
+            continue
+        index[sound_key(source)] = {
+            'source': source,
+            'mtime': os.stat(source).st_mtime_ns,
+            'mixer': list(mixer_format),
+        }
+        blobs.append(pygame.mixer.Sound(source).get_raw())
+
+    # Offsets depend on the index length, so lay the file out in two passes
+    keys = list(index)
+    for key, blob in zip(keys, blobs):
+        index[key]['length'] = len(blob)
+        index[key]['offset'] = 0
+    header_size = len(BUNDLE_MAGIC) + 4 + len(json.dumps(index).encode()) + 16 * len(keys)
+
+    offset = _align(header_size)
+    for key, blob in zip(keys, blobs):
+        index[key]['offset'] = offset
+        offset = _align(offset + len(blob))
+    index_bytes = json.dumps(index).encode()
+    assert len(index_bytes) <= header_size - len(BUNDLE_MAGIC) - 4, "bundle index outgrew its slot"
+    index_bytes = index_bytes.ljust(header_size - len(BUNDLE_MAGIC) - 4)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BUNDLE_MAGIC)
+        f.write(struct.pack('<I', len(index_bytes)))
+        f.write(index_bytes)
+        for key, blob in zip(keys, blobs):
+            f.write(b'\0' * (index[key]['offset'] - f.tell()))
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+    pygame.quit()
+    print(f"Wrote {len(keys)} assets ({offset // 1024} KiB) to {path}")
+
+
+def _align(offset):
+    return (offset + BUNDLE_ALIGN - 1) // BUNDLE_ALIGN * BUNDLE_ALIGN
+
+
+if __name__ == '__main__':
+    build_bundle(sys.argv[1] if len(sys.argv) > 1 else BUNDLE_PATH)
@@ -0,0 +1,255 @@
+"""Frame-time benchmark for GeoMaster's scenes.
+
+Runs every scene headless under the SDL dummy drivers with scripted mouse
+input for a fixed number of frames and reports p50/p95/p99 frame times plus
+allocations per frame. Results are compared with the stored baselines and
+the process exits with status 1 when a scene got slower or allocates more:
+
+    python benchmark.py                     # run and compare
+    python benchmark.py --update-baselines  # record new baselines
+
+Baselines depend on the machine, so record them on the box that runs the
+comparison.
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+import main
+
+BASELINES_PATH = 'benchmark_baselines.json'
+FRAMES = 300
+WARMUP_FRAMES = 10  # First frames of a scene load assets and fill caches
+TIME_TOLERANCE = 0.5  # Allowed slowdown over the baseline p95 before failing
+TIME_SLACK_MS = 0.25  # Absolute slack so sub-millisecond scenes don't flake
+ALLOC_TOLERANCE = 0.25
+SIMULATED_FRAME_MS = 1000 // main.FPS_CAP
+
+
+class _StopScene(Exception):
+    pass
+
+
+class ScriptedFrames:
+    """Stands in for the frame clock and the event queue while a scene runs.
+
+    Every loop in the game ends its frame with one Clock.tick, so the fake
+    clock marks frame boundaries, never sleeps, and stops the scene once
+    enough frames were recorded. Mouse input comes from a fixed script of
+    positions; with clicks=True every move is followed by a click there.
+    """
+
+    def __init__(self, frames, points, clicks=False, trace_allocations=False):
+        self.frames = frames
+        self.points = points
+        self.clicks = clicks
+        self.trace_allocations = trace_allocations
+        self.frame = 0
+        self.times = []
+        self.allocations = []
+        self._last = None
+        self._mouse = points[0]
+        self._pending = []
+
+    # pygame.time.Clock
+    def tick(self, framerate=0):
+        now = time.perf_counter()
+        if self._last is not None and self.frame > WARMUP_FRAMES:
+            self.times.append(now - self._last)
+            if self.trace_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                self.allocations.append(peak - self._traced)
+        self.frame += 1
+        if len(self.times) >= self.frames:
+            raise _StopScene
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            self._traced = tracemalloc.get_traced_memory()[0]
+        self._last = time.perf_counter()
+        return SIMULATED_FRAME_MS
+
+    def get_ticks(self):
+        return self.frame * SIMULATED_FRAME_MS
+
+    def get_pos(self):
+        return self._mouse
+
+    def _script(self):
+        # Move the mouse every few frames so hover states keep changing
+        pos = self.points[(self.frame // 3) % len(self.points)]
+        if pos != self._mouse:
+            self._mouse = pos
+            self._pending.append(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+            if self.clicks:
+                self._pending.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+
+    def get_events(self, *args, **kwargs):
+        self._script()
+        events, self._pending = self._pending, []
+        return events
+
+    def wait_event(self, *args, **kwargs):
+        self._script()
+        if self._pending:
+            return self._pending.pop(0)
+        return pygame.event.Event(pygame.NOEVENT)
+
+
+FADE_SCENE = 'fade_in/fade_out'
+
+
+class _FadeLoop(main.Scene):
+    # Fades to black and back again, over and over
+    def update(self):
+        main.scenes.fade(lambda: None, 500)
+
+
+def _run(scene_type, *args):
+    return lambda: main.scenes.run(scene_type(*args))
+
+
+def scenes():
+    """Return (name, scene, mouse positions, clicks) for every benchmarked scene."""
+    # Hovers over the menu buttons, flag quiz options, monument answers and map countries
+    scene_list = [('main_menu', _run(main.MainMenu), [(450, 250), (450, 320), (450, 390), (450, 460), (450, 550), (10, 10)], False)]
+    for stage_index in range(len(main.CapitalsGame().stages)):
+        # Clicking through the flags column keeps changing the selection
+        scene_list.append((f'level[{stage_index}]', _run(main.CapitalsScene, stage_index),
+                           [(150, 180), (150, 260), (150, 340)], True))
+    scene_list += [
+        ('flag_guessing_game', _run(main.FlagQuizScene), [(290, 360), (450, 360), (10, 10)], False),
+        ('monument_question_level', _run(main.MonumentQuizScene), [(300, 400), (600, 400), (10, 10)], False),
+        ('map_quiz_game', _run(main.MapQuizScene), [(450, 300), (300, 250), (620, 200), (150, 420)], False),
+        # Clicking answers rounds, so the feedback and the next round get drawn too
+        ('capital_location_game', _run(main.CapitalFinderScene), [(450, 300), (300, 250), (620, 200)], True),
+        ('show_end_screen', _run(main.EndScreen, 3, 5), [(450, 450), (10, 10)], False),
+        (FADE_SCENE, _run(_FadeLoop), [(10, 10)], False),
+    ]
+    return scene_list
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _play(name, scene, points, clicks, frames, trace_allocations):
+    script = ScriptedFrames(frames, points, clicks, trace_allocations)
+    saved = (pygame.event.get, pygame.event.wait, pygame.mouse.get_pos, pygame.time.get_ticks,
+             main.frame_scheduler.clock, main.timers, main.scenes.transitions)
+    pygame.event.get = script.get_events
+    pygame.event.wait = script.wait_event
+    pygame.mouse.get_pos = script.get_pos
+    pygame.time.get_ticks = script.get_ticks
+    main.frame_scheduler.clock = script
+    # Timers left over from an interrupted scene would run on the next one's clock
+    main.timers = main.Timers()
+    # Transitions are measured on their own, not as part of every scene
+    main.scenes.transitions = name == FADE_SCENE
+    try:
+        scene()
+    except _StopScene:
+        pass
+    finally:
+        (pygame.event.get, pygame.event.wait, pygame.mouse.get_pos, pygame.time.get_ticks,
+         main.frame_scheduler.clock, main.timers, main.scenes.transitions) = saved
+    return script
+
+
+def measure(name, scene, points, clicks=False, frames=FRAMES):
+    random.seed(name)
+    surfaces_before = main.surface_pool.stats()['allocations']
+    timing = _play(name, scene, points, clicks, frames, trace_allocations=False)
+    surfaces = (main.surface_pool.stats()['allocations'] - surfaces_before) / frames
+    # Prefetches still loading on the worker thread would count as this scene's allocations
+    main.prefetcher.wait()
+
+    tracemalloc.start()
+    try:
+        random.seed(name)
+        traced = _play(name, scene, points, clicks, frames, trace_allocations=True)
+    finally:
+        tracemalloc.stop()
+
+    times_ms = [t * 1000 for t in timing.times]
+    return {
+        'p50_ms': round(_percentile(times_ms, 50), 3),
+        'p95_ms': round(_percentile(times_ms, 95), 3),
+        'p99_ms': round(_percentile(times_ms, 99), 3),
+        'alloc_kib': round(sum(traced.allocations) / len(traced.allocations) / 1024, 2),
+        'surfaces': round(surfaces, 3),
+    }
+
+
+def compare(name, result, baseline, time_tolerance=TIME_TOLERANCE):
+    """Return a list of regression messages for one scene."""
+    problems = []
+    if result['p95_ms'] > baseline['p95_ms'] * (1 + time_tolerance) + TIME_SLACK_MS:
+        problems.append(f"{name}: p95 {result['p95_ms']:.2f} ms > baseline {baseline['p95_ms']:.2f} ms")
+    if result['alloc_kib'] > baseline['alloc_kib'] * (1 + ALLOC_TOLERANCE) + 1:
+        problems.append(f"{name}: {result['alloc_kib']:.1f} KiB/frame > baseline {baseline['alloc_kib']:.1f} KiB/frame")
+    if result['surfaces'] > baseline['surfaces'] + 0.01:
+        problems.append(f"{name}: {result['surfaces']:.2f} surfaces/frame > baseline {baseline['surfaces']:.2f}")
+    return problems
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Measure per-scene frame times under the SDL dummy driver")
+    parser.add_argument('--frames', type=int, default=FRAMES, help=f"frames measured per scene (default {FRAMES})")
+    parser.add_argument('--scene', action='append', help="only run scenes whose name starts with this (repeatable)")
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    parser.add_argument('--update-baselines', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--tolerance', type=float, default=TIME_TOLERANCE,
+                        help=f"allowed p95 slowdown as a fraction of the baseline (default {TIME_TOLERANCE})")
+    args = parser.parse_args()
+
+    main.init_game()
+    baselines = load_baselines(args.baselines)
+    results = {}
+    problems = []
+
+    print(f"{'scene':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'KiB/frame':>10} {'surf/frame':>11}")
+    for name, scene, points, clicks in scenes():
+        if args.scene and not any(name.startswith(prefix) for prefix in args.scene):
+            continue
+        result = results[name] = measure(name, scene, points, clicks, args.frames)
+        print(f"{name:<24} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+              f"{result['alloc_kib']:>10.1f} {result['surfaces']:>11.2f}")
+        if name in baselines:
+            problems += compare(name, result, baselines[name], args.tolerance)
+
+    if args.update_baselines:
+        baselines.update(results)
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    if not baselines:
+        print(f"No baselines in {args.baselines}; run with --update-baselines to record them.")
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_benchmark())
@@ -0,0 +1,95 @@
+"""Countries, capitals and monuments used by every GeoMaster mode.
+
+The data lives in assets/geodata.json, a packed file with one row per
+country and per monument plus the country lists of the capitals stages.
+QuestionBank loads it once and indexes it by region and difficulty, so a
+round picks its question and distractors without scanning every country.
+"""
+import json
+import os
+from collections import namedtuple
+
+GEODATA_PATH = os.path.join('assets', 'geodata.json')
+GEODATA_VERSION = 1
+
+Country = namedtuple('Country', ['name', 'capital', 'region', 'difficulty', 'lat', 'lon', 'flag'])
+Monument = namedtuple('Monument', ['name', 'country', 'difficulty'])
+
+
+def _rows(table, row_type):
+    if table['fields'] != list(row_type._fields):
+        raise ValueError(f"expected fields {list(row_type._fields)}, got {table['fields']}")
+    return [row_type(*row) for row in table['rows']]
+
+
+def _index(rows, keys):
+    # Every combination of filters, with None standing for "any", maps to its rows
+    index = {}
+    for row in rows:
+        values = keys(row)
+        for mask in range(1 << len(values)):
+            key = tuple(value if mask & (1 << i) else None for i, value in enumerate(values))
+            index.setdefault(key, []).append(row)
+    return {key: tuple(matches) for key, matches in index.items()}
+
+
+def sample_excluding(pool, k, exclude, rng):
+    """Pick up to k distinct items of pool that are not in exclude.
+
+    Draws random positions and rejects repeats, which costs O(k) while k is
+    small next to the pool. Larger requests fall back to filtering the pool.
+    """
+    if 2 * (k + len(exclude)) > len(pool):
+        candidates = [item for item in pool if item not in exclude]
+        return rng.sample(candidates, min(k, len(candidates)))
+    chosen = []
+    seen = set(exclude)
+    while len(chosen) < k:
+        item = pool[rng.randrange(len(pool))]
+        if item not in seen:
+            seen.add(item)
+            chosen.append(item)
+    return chosen
+
+
+class QuestionBank:
+    def __init__(self, data):
+        if data.get('version') != GEODATA_VERSION:
+            raise ValueError(f"unsupported geodata version {data.get('version')}")
+        self.countries = _rows(data['countries'], Country)
+        self.monuments = _rows(data['monuments'], Monument)
+        self.stages = [tuple(stage) for stage in data['stages']]
+        self.by_name = {country.name: country for country in self.countries}
+
+        self._countries = _index(self.countries, lambda c: (c.region, c.difficulty, c.flag))
+        self._monuments = _index(self.monuments,
+                                 lambda m: (self.by_name[m.country].region, m.difficulty))
+
+    def select_countries(self, region=None, difficulty=None, flag=None):
+        return self._countries.get((region, difficulty, flag), ())
+
+    def select_monuments(self, region=None, difficulty=None):
+        return self._monuments.get((region, difficulty), ())
+
+    def capital(self, country):
+        return self.by_name[country].capital
+
+    def capital_stages(self):
+        return [{'flags': list(stage), 'capitals': {country: self.capital(country) for country in stage}}
+                for stage in self.stages]
+
+
+_bank = None
+
+
+def load_bank(path=GEODATA_PATH):
+    with open(path, encoding='utf-8') as f:
+        return QuestionBank(json.load(f))
+
+
+def get_bank():
+    # Loaded on first use so importing this module stays free
+    global _bank
+    if _bank is None:
+        _bank = load_bank()
+    return _bank
@@ -0,0 +1,132 @@
+"""Great-circle distances and nearest-city lookups with NumPy.
+
+haversine_km broadcasts over arrays, so scoring a batch of clicks is one
+call. NearestCityIndex keeps the cities as 3D unit vectors in a KD-tree;
+the straight-line (chord) distance between unit vectors grows with the
+great-circle distance, so the nearest vector is also the nearest city, and
+the tree needs no special cases for the poles or the antimeridian.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KDTREE_LEAF_SIZE = 8
+BRUTE_FORCE_MAX_CITIES = 4096  # Lookups compare against every city up to this many
+BRUTE_FORCE_CHUNK = 1 << 20  # Distance matrix entries computed at once
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(lats, lons):
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    cos_lat = np.cos(lats)
+    return np.stack([cos_lat * np.cos(lons), cos_lat * np.sin(lons), np.sin(lats)], axis=-1)
+
+
+def distance_summary(distances):
+    """Aggregate statistics of a session's (or a batch's) distances in km."""
+    distances = np.asarray(distances, dtype=float)
+    if distances.size == 0:
+        return {'count': 0}
+    return {
+        'count': int(distances.size),
+        'mean_km': float(distances.mean()),
+        'median_km': float(np.median(distances)),
+        'p90_km': float(np.percentile(distances, 90)),
+        'best_km': float(distances.min()),
+        'worst_km': float(distances.max()),
+    }
+
+
+def _require_finite(lats, lons):
+    # NaN matches no city, and each lookup path would pick a different arbitrary one
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError("latitude and longitude must be finite numbers")
+
+
+class NearestCityIndex:
+    """KD-tree over city positions answering "which city is closest to here"."""
+
+    def __init__(self, lats, lons, leaf_size=KDTREE_LEAF_SIZE):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lons = np.asarray(lons, dtype=float)
+        self.points = unit_vectors(self.lats, self.lons)
+        self.leaf_size = leaf_size
+        self._order = np.arange(len(self.lats))
+        # Nodes are (axis, split, left, right) or (-1, start, end, None) for leaves
+        self._nodes = []
+        self._root = self._build(0, len(self.lats)) if len(self.lats) else None
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _build(self, start, end):
+        indexes = self._order[start:end]
+        if end - start <= self.leaf_size:
+            self._nodes.append((-1, start, end, None))
+            return len(self._nodes) - 1
+        points = self.points[indexes]
+        axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+        self._order[start:end] = indexes[np.argsort(points[:, axis], kind='stable')]
+        middle = (start + end) // 2
+        split = float(self.points[self._order[middle], axis])
+        node = len(self._nodes)
+        self._nodes.append(None)
+        left = self._build(start, middle)
+        right = self._build(middle, end)
+        self._nodes[node] = (axis, split, left, right)
+        return node
+
+    def _search(self, query):
+        best_index, best_chord = -1, math.inf
+        stack = [self._root]
+        while stack:
+            axis, a, b, c = self._nodes[stack.pop()]
+            if axis < 0:
+                candidates = self._order[a:b]
+                chords = ((self.points[candidates] - query) ** 2).sum(axis=1)
+                i = int(np.argmin(chords))
+                if chords[i] < best_chord:
+                    best_index, best_chord = int(candidates[i]), float(chords[i])
+                continue
+            offset = query[axis] - a
+            near, far = (b, c) if offset < 0 else (c, b)
+            # The far side can only hold a closer city if the split plane is closer
+            if offset * offset < best_chord:
+                stack.append(far)
+            stack.append(near)
+        return best_index
+
+    def nearest(self, lat, lon):
+        """Return (city index, distance in km) of the city closest to a point."""
+        _require_finite(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        query = unit_vectors(lat, lon)
+        if len(self) <= BRUTE_FORCE_MAX_CITIES:
+            # One matrix-vector product beats walking the tree in Python at these sizes
+            i = int(np.argmax(self.points @ query))  # Largest dot product
+        else:
+            i = self._search(query)
+        return i, float(haversine_km(lat, lon, self.lats[i], self.lons[i]))
+
+    def nearest_many(self, lats, lons):
+        """Vectorised nearest() for arrays of points; returns (indexes, km)."""
+        lats = np.asarray(lats, dtype=float).reshape(-1)
+        lons = np.asarray(lons, dtype=float).reshape(-1)
+        _require_finite(lats, lons)
+        queries = unit_vectors(lats, lons).reshape(-1, 3)
+        if len(self) <= BRUTE_FORCE_MAX_CITIES:
+            # For the game's city counts a chunked distance matrix beats walking the tree
+            indexes = np.empty(len(queries), dtype=int)
+            step = max(1, BRUTE_FORCE_CHUNK // max(len(self), 1))
+            for start in range(0, len(queries), step):
+                chunk = queries[start:start + step]
+                indexes[start:start + step] = np.argmin(chunk @ -self.points.T, axis=1)  # Largest dot product
+        else:
+            indexes = np.array([self._search(query) for query in queries], dtype=int)
+        return indexes, haversine_km(lats, lons, self.lats[indexes], self.lons[indexes])
@@ -1,44 +1,431 @@
-import pygame
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import argparse
+import atexit
+import functools
+import hashlib
+import heapq
+import json
+import queue
+import threading
 import sys
 import random
 import os
-import pygal
+import math
+from contextlib import contextmanager
 from itertools import permutations
+from collections import Counter, OrderedDict
 
+import pygame
 
+from asset_bundle import open_bundle
+from game_data import get_bank
+from quiz_engine import (
+    GAME_COMPLETE, GAME_OVER, LOCATION_MAX_POINTS, STAGE_COMPLETE, Answer, CapitalsGame, ChooseCapital,
+    ClickLocation, NextStage, SelectFlag, capital_location_quiz, flag_quiz, map_quiz, monument_quiz,
+)
+from results_log import RESULTS_LOG_PATH, ResultsLog
 
-# Initialize pygame
-pygame.init()
+# Importing this module has no side effects: pygame, the window, fonts and
+# assets are brought up by init_game() or on first use. NumPy and the world
+# map are imported inside the functions that use them.
 
-# Screen dimensions
+# Screen dimensions. Layouts are in these logical units whatever the window
+# size; ScaledDisplay maps them onto the window.
 SCREEN_WIDTH = 900
 SCREEN_HEIGHT = 600
 
+# Set up by init_game()
+screen = None
+bundle = None
+background_image = None
+FONT = FONT_SMALL = FONT_MEDIUM = FONT_LARGE = None
 
-# Load background image
 BG_IMAGE_PATH = os.path.join('assets', 'background.png')
-if os.path.exists(BG_IMAGE_PATH):
-    background_image = pygame.image.load(BG_IMAGE_PATH)
-    background_image = pygame.transform.scale(background_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-else:
-    background_image = None
-
-# Try loading a custom font
 FONT_PATH = os.path.join('assets', 'YourCustomFont.ttf')
-if os.path.exists(FONT_PATH):
-    FONT = pygame.font.Font(FONT_PATH, 36)
-    FONT_SMALL = pygame.font.Font(FONT_PATH, 28)
-else:
-    FONT_SMALL = pygame.font.Font(None, 28)
-    FONT = pygame.font.Font(None, 36)
-    FONT_MEDIUM = pygame.font.Font(None, 48)
-    FONT_LARGE = pygame.font.Font(None, 100)
+
+
+class StartupProfiler:
+    """Accumulates time per startup phase until the first menu frame is shown."""
+
+    def __init__(self):
+        self.enabled = False
+        self.finished = False
+        self.phases = OrderedDict()
+
+    def enable(self, import_time):
+        self.enabled = True
+        self.phases['imports'] = import_time
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled or self.finished:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def first_frame(self):
+        if not self.enabled or self.finished:
+            return
+        self.finished = True
+        total = time.perf_counter() - _IMPORT_START
+        print("Startup profile (time to first menu frame):")
+        for name, seconds in self.phases.items():
+            print(f"  {name:<14} {seconds * 1000:8.1f} ms")
+        accounted = sum(self.phases.values())
+        print(f"  {'other':<14} {(total - accounted) * 1000:8.1f} ms")
+        print(f"  {'total':<14} {total * 1000:8.1f} ms")
+        pygame.quit()
+        sys.exit()
+
+
+startup_profiler = StartupProfiler()
+
+FULLSCREEN_HOTKEY = pygame.K_F11
+MOUSE_EVENTS = (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+
+class ScaledDisplay:
+    """Shows the SCREEN_WIDTH x SCREEN_HEIGHT logical screen in a window of any size.
+
+    While the window has exactly the logical size, scenes draw straight into
+    it. Otherwise they draw into an off-screen canvas of the logical size
+    that is scaled into the largest centred rect that fits the window; only
+    the dirty parts are scaled on partial updates. Mouse positions are
+    mapped back to logical units before any scene sees them, so layouts
+    and hit tests never depend on the window size. F11 toggles fullscreen.
+    """
+
+    def __init__(self):
+        self.window = None
+        self.canvas = None
+        self.viewport = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.windowed_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.fullscreen = False
+
+    @property
+    def scaled(self):
+        return screen is not self.window
+
+    def open(self, fullscreen=False):
+        if fullscreen:
+            self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.window = pygame.display.set_mode(self.windowed_size, pygame.RESIZABLE)
+        self.fullscreen = fullscreen
+        self._layout()
+
+    def toggle_fullscreen(self):
+        self.open(not self.fullscreen)
+
+    def resize(self, size):
+        # SDL has usually resized the window surface already
+        if self.window.get_size() != tuple(size):
+            self.window = pygame.display.set_mode(size, pygame.RESIZABLE)
+        self.windowed_size = self.window.get_size()
+        self._layout()
+
+    def _layout(self):
+        global screen
+        width, height = self.window.get_size()
+        if (width, height) == (SCREEN_WIDTH, SCREEN_HEIGHT):
+            self.viewport = self.window.get_rect()
+            screen = self.window
+        else:
+            scale = min(width / SCREEN_WIDTH, height / SCREEN_HEIGHT)
+            self.viewport = pygame.Rect(0, 0, round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale))
+            self.viewport.center = (width // 2, height // 2)
+            if self.canvas is None:
+                self.canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), 0, self.window)
+            screen = self.canvas
+            self.window.fill(BLACK)  # Letterbox bars are never drawn over
+        renderer.begin_scene()
+
+    def to_logical(self, pos):
+        if not self.scaled:
+            return pos
+        x, y = pos
+        return ((x - self.viewport.x) * SCREEN_WIDTH // self.viewport.width,
+                (y - self.viewport.y) * SCREEN_HEIGHT // self.viewport.height)
+
+    def mouse_pos(self):
+        return self.to_logical(pygame.mouse.get_pos())
+
+    def handle(self, events):
+        for event in events:
+            if event.type == pygame.VIDEORESIZE and not self.fullscreen:
+                self.resize(event.size)
+            elif event.type == pygame.KEYDOWN and event.key == FULLSCREEN_HOTKEY:
+                self.toggle_fullscreen()
+            elif event.type in MOUSE_EVENTS and self.scaled:
+                event.pos = self.to_logical(event.pos)
+                if event.type == pygame.MOUSEMOTION:
+                    event.rel = (event.rel[0] * SCREEN_WIDTH // self.viewport.width,
+                                 event.rel[1] * SCREEN_HEIGHT // self.viewport.height)
+        return events
+
+    def _to_window(self, rect):
+        sx = self.viewport.width / SCREEN_WIDTH
+        sy = self.viewport.height / SCREEN_HEIGHT
+        left, top = math.floor(rect.left * sx), math.floor(rect.top * sy)
+        right, bottom = math.ceil(rect.right * sx), math.ceil(rect.bottom * sy)
+        return pygame.Rect(self.viewport.x + left, self.viewport.y + top, right - left, bottom - top)
+
+    def flip(self):
+        if self.scaled:
+            pygame.transform.smoothscale(self.canvas, self.viewport.size, self.window.subsurface(self.viewport))
+        pygame.display.flip()
+
+    def update(self, rects):
+        if not self.scaled:
+            pygame.display.update(rects)
+            return
+        updated = []
+        for rect in rects:
+            # Scale a slightly larger area so smoothing leaves no seams at the edges
+            source = rect.inflate(4, 4).clip(self.canvas.get_rect())
+            target = self._to_window(source)
+            if not target.width or not target.height:
+                continue
+            scaled = pygame.transform.smoothscale(self.canvas.subsurface(source), target.size)
+            inner = self._to_window(rect)
+            self.window.blit(scaled, inner.topleft, inner.move(-target.x, -target.y))
+            updated.append(inner)
+        pygame.display.update(updated)
+
+
+display = ScaledDisplay()
+
+
+def init_game():
+    global bundle, FONT, FONT_SMALL, FONT_MEDIUM, FONT_LARGE
+    if screen is not None:
+        return
+
+    with startup_profiler.phase('display init'):
+        pygame.init()
+        display.open()
+        pygame.display.set_caption("Flags and Capitals Game")
+
+    # Pre-decoded pixels and sounds built by asset_bundle.py, if the bundle exists
+    with startup_profiler.phase('asset bundle'):
+        bundle = open_bundle()
+
+    # Try loading a custom font
+    with startup_profiler.phase('font init'):
+        font_file = FONT_PATH if os.path.exists(FONT_PATH) else None
+        FONT_SMALL = pygame.font.Font(font_file, 28)
+        FONT = pygame.font.Font(font_file, 36)
+        FONT_MEDIUM = pygame.font.Font(font_file, 48)
+        FONT_LARGE = pygame.font.Font(font_file, 100)
+
+
+def load_background(path):
+    # Prefetched backgrounds are ready immediately; anything else loads here
+    found, image = prefetcher.get('image', path)
+    if found:
+        return image
+    with startup_profiler.phase('image decode'):
+        return backgrounds.get(path)
+
+
+def _decode_background(path):
+    # Backgrounds always fill the logical screen, so they are bundled at that
+    # size; ScaledDisplay scales the finished frame, never the images
+    size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+    frame_metrics.count('image_loads')
+    image = bundle.image(path, size) if bundle else None
+    if not image:
+        try:
+            image = pygame.transform.scale(pygame.image.load(path), size)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Error loading background image {path}: {e}")
+            return None
+    # Converted once here, like the flag atlases and gradients, so every blit
+    # is a plain copy instead of a per-pixel format conversion
+    if pygame.display.get_surface() is not None:
+        image = image.convert()
+    return image
+
+
+BACKGROUND_CACHE_BUDGET = 16 * 1024 * 1024  # Bytes of decoded backgrounds kept before evicting
+
+
+class BackgroundCache:
+    """Decoded full-screen backgrounds kept under a byte budget, least recently used out first.
+
+    Scenes drop their prefetched copies on exit, so a background shown again
+    later comes from here instead of its file. The prefetch thread shares it
+    with the main thread.
+    """
+
+    def __init__(self, decode, budget=BACKGROUND_CACHE_BUDGET):
+        self.decode = decode
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        with self._lock:
+            image = self._images.get(path)
+            if image is not None:
+                self._images.move_to_end(path)
+                self.hits += 1
+                return image
+            self.misses += 1
+        image = self.decode(path)
+        if image is None:
+            return None
+        with self._lock:
+            if path not in self._images:
+                self._images[path] = image
+                self.used += _surface_bytes(image)
+                self._evict()
+            return image
+
+    def _evict(self):
+        # Drop least recently used backgrounds, but always keep the newest one
+        while self.used > self.budget and len(self._images) > 1:
+            _, image = self._images.popitem(last=False)
+            self.used -= _surface_bytes(image)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'images': len(self._images),
+            'bytes': self.used,
+            'budget': self.budget,
+        }
+
+
+backgrounds = BackgroundCache(_decode_background)
+
+
+MUSIC_READ_BUFFER = bytearray(1 << 18)  # Reused by the prefetch thread, the only reader
+
+
+def _read_music(path):
+    # Reading the track pulls it into the OS file cache before the mixer opens it
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while f.readinto(MUSIC_READ_BUFFER):
+                pass
+    except OSError:
+        pass
+
+
+class AssetPrefetcher:
+    """Loads backgrounds and music on a worker thread while a scene is running.
+
+    Finished backgrounds stay in memory and are handed to the main thread by
+    get(). get() only waits for the asset the worker is loading right now;
+    one that is still queued is taken off the queue and reported as a miss,
+    so the caller loads it without waiting behind unrelated assets.
+    """
+
+    LOADERS = {'image': backgrounds.get, 'music': _read_music}
+    KEPT = {'image'}  # Music is only read to warm the OS file cache; nothing is handed over
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._ready = {}
+        self._queued = set()
+        self._loading = None
+        self._done = threading.Condition()
+        self._thread = None
+
+    def request(self, kind, path):
+        key = (kind, path)
+        with self._done:
+            if key in self._ready or key in self._queued or key == self._loading:
+                return
+            self._queued.add(key)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='asset-prefetch', daemon=True)
+            self._thread.start()
+        self._queue.put(key)
+
+    def get(self, kind, path):
+        key = (kind, path)
+        with self._done:
+            # Waiting for the load in flight is never slower than starting over
+            while key == self._loading:
+                self._done.wait()
+            if key in self._ready:
+                return True, self._ready[key]
+            # Still queued: the worker skips it and the caller loads it now
+            self._queued.discard(key)
+        return False, None
+
+    def discard(self, kind, path):
+        # Scenes drop their assets on exit; backgrounds stay in the background cache
+        with self._done:
+            self._ready.pop((kind, path), None)
+
+    def wait(self):
+        # Block until every requested asset has finished loading
+        with self._done:
+            while self._queued or self._loading:
+                self._done.wait()
+
+    def _run(self):
+        while True:
+            kind, path = key = self._queue.get()
+            with self._done:
+                if key not in self._queued:
+                    continue  # The main thread took it over
+                self._queued.discard(key)
+                self._loading = key
+            try:
+                result = self.LOADERS[kind](path)
+            except Exception as e:
+                print(f"Warning: Could not prefetch {path}: {e}")
+                result = None
+            with self._done:
+                if kind in self.KEPT:
+                    self._ready[key] = result
+                self._loading = None
+                self._done.notify_all()
+
+
+prefetcher = AssetPrefetcher()
 
 CAPITALS_MUSIC_PATH = os.path.join('assets', 'sounds', 'capitals.mp3')
 FLAGS_MUSIC_PATH = os.path.join('assets', 'sounds', 'flags.mp3')
 MONUMENTS_MUSIC_PATH = os.path.join('assets', 'sounds', 'monument.mp3')
 MENU_MUSIC_PATH = os.path.join('assets', 'sounds', 'main.mp3')
 
+MENU_BACKGROUND_PATH = os.path.join('assets', 'mainMenu_background.webp')
+FLAGS_BACKGROUND_PATH = os.path.join('assets', 'flags_background.png')
+MONUMENT_BACKGROUND_PATH = os.path.join('assets', 'monument_background.webp')
+END_BACKGROUND_PATH = os.path.join('assets', 'endBackground.webp')
+
+# Assets each scene is likely to need next, loaded in the background on entry
+PREFETCH_NEXT = {
+    'menu': [('image', BG_IMAGE_PATH), ('music', CAPITALS_MUSIC_PATH),
+             ('image', FLAGS_BACKGROUND_PATH), ('music', FLAGS_MUSIC_PATH),
+             ('image', MONUMENT_BACKGROUND_PATH), ('music', MONUMENTS_MUSIC_PATH)],
+    'capitals': [('image', MENU_BACKGROUND_PATH), ('music', MENU_MUSIC_PATH)],
+    'flags': [('image', END_BACKGROUND_PATH), ('image', MENU_BACKGROUND_PATH), ('music', MENU_MUSIC_PATH)],
+    'monuments': [('image', MENU_BACKGROUND_PATH), ('music', MENU_MUSIC_PATH)],
+    'map': [('image', END_BACKGROUND_PATH), ('image', MENU_BACKGROUND_PATH), ('music', MENU_MUSIC_PATH)],
+}
+
+
+def prefetch_next(scene):
+    for kind, path in PREFETCH_NEXT[scene]:
+        prefetcher.request(kind, path)
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -59,117 +446,265 @@ DARK_NAVY = (0, 0, 80)
 
 
 def change_background_music(music_path):
-    if os.path.exists(music_path):
-        pygame.mixer.music.stop()  # Stop current music
-        pygame.mixer.music.load(music_path)  # Load the new track
-        pygame.mixer.music.set_volume(0.5)  # Adjust volume (0.0 to 1.0)
-        pygame.mixer.music.play(-1)  # Loop indefinitely
-    else:
-        print(f"Warning: Music file not found at {music_path}")
-
-# Load flag images
-def load_flag_image(name, size=(180, 120)):
-    path = os.path.join('assets', 'Flags', f'{name}.png')
-    if os.path.exists(path):
-        img = pygame.image.load(path)
-        return pygame.transform.scale(img, size)
-    else:
-        # Placeholder for missing flags
-        img = pygame.Surface(size)
-        img.fill(GRAY)
-        return img
-
-# Generate flag variations
-
-def run_sequential_game():
-    total_score = 0
-    max_score = 0
-
-    # Define the levels in sequence
-    levels = [
-        ("Country Capitals", lambda: level(0)),
-        ("Flag Guessing", flag_guessing_game),
-        ("Monument Quiz", monument_question_level)
-    ]
+    # Crossfades from the current track; the switch itself happens in audio.update()
+    audio.play_music(music_path)
+
+# Flag surfaces are decoded once per size into a shared atlas and handed out as
+# subsurfaces. Callers must treat returned surfaces as read-only.
+FLAGS_DIR = os.path.join('assets', 'Flags')
+FLAG_SIZE = (100, 60)
+FLAG_CACHE_BUDGET = 4 * 1024 * 1024  # Bytes of atlas pixels kept before evicting
+
+
+class FlagAtlas:
+    """All flags of one size packed into a single display-format surface."""
+
+    def __init__(self, size):
+        self.size = size
+        self.converted = False
+        self.index = {}
+        self._subsurfaces = {}
+
+        names = sorted(os.path.splitext(entry)[0] for entry in os.listdir(FLAGS_DIR)
+                       if entry.lower().endswith('.png')) if os.path.isdir(FLAGS_DIR) else []
+        images = {}
+        for name in names:
+            image = _decode_flag_image(name, size)
+            if image is not None:
+                images[name] = image
+
+        # Every flag has the same size, so a plain grid packs them tightly
+        columns = max(1, math.ceil(math.sqrt(len(images))))
+        rows = max(1, math.ceil(len(images) / columns))
+        has_alpha = any(image.get_flags() & pygame.SRCALPHA for image in images.values())
+        self.surface = pygame.Surface((columns * size[0], rows * size[1]),
+                                      pygame.SRCALPHA if has_alpha else 0)
+        for i, (name, image) in enumerate(images.items()):
+            rect = pygame.Rect((i % columns) * size[0], (i // columns) * size[1], *size)
+            self.surface.blit(image, rect)
+            self.index[name] = rect
+
+        self.has_alpha = has_alpha
+        self.ensure_display_format()
+        self._build_subsurfaces()
+
+    def __contains__(self, name):
+        return name in self._subsurfaces
+
+    @property
+    def bytes(self):
+        return _surface_bytes(self.surface)
+
+    def ensure_display_format(self):
+        # Conversion needs an open window; until then keep the raw pixels
+        if self.converted or pygame.display.get_surface() is None:
+            return
+        self.surface = self.surface.convert_alpha() if self.has_alpha else self.surface.convert()
+        self.converted = True
+        self._build_subsurfaces()
+
+    def _build_subsurfaces(self):
+        fallbacks = {name: s for name, s in self._subsurfaces.items() if name not in self.index}
+        self._subsurfaces = {name: self.surface.subsurface(rect) for name, rect in self.index.items()}
+        self._subsurfaces.update(fallbacks)
+
+    def get(self, name):
+        surface = self._subsurfaces.get(name)
+        if surface is None:
+            print(f"Warning: Image file not found for {name} in {FLAGS_DIR}. Using fallback.")
+            surface = pygame.Surface(self.size)
+            surface.fill(RED)
+            self._subsurfaces[name] = surface
+        return surface
+
+
+class FlagCache:
+    def __init__(self, budget=FLAG_CACHE_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._atlases = OrderedDict()
+        self._signature = None
+
+    def get(self, country, size=FLAG_SIZE):
+        size = tuple(size)
+        atlas = self._atlases.get(size)
+        if atlas is not None and country in atlas:
+            self._atlases.move_to_end(size)
+            atlas.ensure_display_format()
+            self.hits += 1
+            return atlas.get(country)
+
+        self.misses += 1
+        if atlas is None:
+            atlas = FlagAtlas(size)
+            self._atlases[size] = atlas
+            self.used += atlas.bytes
+            self._evict()
+        return atlas.get(country)
+
+    def refresh(self):
+        # Scenes that show flags call this on entry, so the files are scanned
+        # once per scene rather than during frames. Atlases are rebuilt on next
+        # use when flags were added, removed or edited on disk.
+        signature = _flags_dir_signature()
+        if signature != self._signature:
+            self._signature = signature
+            self.clear()
+
+    def _evict(self):
+        # Drop least recently used atlases, but always keep the newest one
+        while self.used > self.budget and len(self._atlases) > 1:
+            _, atlas = self._atlases.popitem(last=False)
+            self.used -= atlas.bytes
+
+    def clear(self):
+        self._atlases.clear()
+        self.used = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'atlases': len(self._atlases),
+            'bytes': self.used,
+            'budget': self.budget,
+        }
 
-    for level_name, level_func in levels:
-        # Display level start message
-        draw_background()
-        draw_text_with_shadow(f"Starting {level_name}", FONT, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        pygame.display.update()
-        pygame.time.wait(2000)
 
-        # Run the level and get the score
-        level_score, level_max_score = level_func()
-        total_score += level_score
-        max_score += level_max_score
+def _surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
 
-        # Show interim score
-        draw_background()
-        draw_text_with_shadow(
-            f"{level_name} Complete! Score: {level_score}/{level_max_score}",
-            FONT, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-        )
-        pygame.display.update()
-        pygame.time.wait(3000)
 
-    # Final score display
-    show_final_score(total_score, max_score)
+def _flags_dir_signature():
+    if not os.path.isdir(FLAGS_DIR):
+        return ()
+    return tuple(sorted((entry.name, entry.stat().st_mtime_ns)
+                        for entry in os.scandir(FLAGS_DIR) if entry.is_file()))
 
-    def show_final_score(total_score, max_score):
-        draw_gradient_background(screen, LIGHT_BLUE, DARK_BLUE)
-        box_rect = pygame.Rect(SCREEN_WIDTH // 2 - 250, SCREEN_HEIGHT // 2 - 150, 500, 300)
-        pygame.draw.rect(screen, YELLOW if total_score > max_score // 2 else RED, box_rect, border_radius=15)
-        pygame.draw.rect(screen, BLACK, box_rect, 5, border_radius=15)
-    
-        message = "Victory!" if total_score > max_score // 2 else "Game Over!"
-        draw_text(message, FONT, BLACK, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 40)
-        draw_text(f"Total Score: {total_score}/{max_score}", FONT_SMALL, BLACK, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40)
-        pygame.display.update()
-        pygame.time.wait(5000)
 
+def _decode_flag_image(country, size):
+    image_path = os.path.join(FLAGS_DIR, f'{country}.png')
+    frame_metrics.count('image_loads')
+    with startup_profiler.phase('image decode'):
+        if bundle:
+            image = bundle.image(image_path, size)
+            if image:
+                return image
+        try:
+            img = pygame.image.load(image_path)
+            return pygame.transform.scale(img, size)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Warning: Could not load image for {country}. Using fallback surface. Error: {e}")
+            return None
 
 
-def generate_variations(country, size=(180, 120), bg_color=(255, 255, 255)):
-    # Load the correct flag image
-    correct_flag = load_flag_image(country, size)
-    incorrect_flags = []
+flag_cache = FlagCache()
 
-    # Analyze flag structure
-    regions = [
-        pygame.Rect(0, 0, size[0] // 3, size[1]),        # Left section
-        pygame.Rect(size[0] // 3, 0, size[0] // 3, size[1]),  # Middle section
-        pygame.Rect(2 * size[0] // 3, 0, size[0] // 3, size[1])  # Right section
-    ]
 
-    # Extract and copy the regions
-    segments = [correct_flag.subsurface(region).copy() for region in regions]
+def load_flag_image(country, size=FLAG_SIZE):
+    return flag_cache.get(country, size)
 
-    # Generate all unique permutations of the regions
-    all_permutations = list(permutations(segments))
-    random.shuffle(all_permutations)  # Randomize the order of permutations
-
-    # Select two unique permutations that are not the same as the correct order
-    incorrect_variations = [perm for perm in all_permutations if perm != tuple(segments)]
-    selected_variations = incorrect_variations[:2]
+# Generate flag variations
 
-    # Create flag variations based on the selected permutations
-    for variation_order in selected_variations:
-        variation = pygame.Surface(size)
-        variation.fill(bg_color)  # Set background color
-        for i, segment in enumerate(variation_order):
-            variation.blit(segment, (i * (size[0] // 3), 0))  # Place segments
-        incorrect_flags.append(variation)
+VARIATION_CACHE_SIZE = 64  # Flags whose distractors are kept, per size
+VARIATION_SWAP_COLORS = 3  # Most common colours considered for colour swaps
+
+
+def _segment_shuffles(pixels, axis):
+    # Cut the flag into thirds along one axis and reorder them
+    length = pixels.shape[axis]
+    cuts = [0, length // 3, 2 * length // 3, length]
+    import numpy as np
+
+    segments = [pixels.take(range(cuts[i], cuts[i + 1]), axis=axis) for i in range(3)]
+    for order in permutations(range(3)):
+        if order != (0, 1, 2):
+            yield np.concatenate([segments[i] for i in order], axis=axis)
+
+
+def _color_swaps(pixels):
+    # Exchange each pair of the flag's dominant colours
+    import numpy as np
+
+    packed = (pixels[..., 0].astype(np.uint32) << 16) | (pixels[..., 1].astype(np.uint32) << 8) | pixels[..., 2]
+    colors, counts = np.unique(packed, return_counts=True)
+    dominant = colors[np.argsort(counts)[::-1][:VARIATION_SWAP_COLORS]]
+    for i in range(len(dominant)):
+        for j in range(i + 1, len(dominant)):
+            a, b = dominant[i], dominant[j]
+            swapped = np.where(packed == a, b, np.where(packed == b, a, packed))
+            yield np.stack([(swapped >> 16) & 0xFF, (swapped >> 8) & 0xFF, swapped & 0xFF], axis=-1).astype(np.uint8)
+
+
+def _flag_variants(pixels):
+    yield from _segment_shuffles(pixels, 0)  # Vertical bands
+    yield from _segment_shuffles(pixels, 1)  # Horizontal stripes
+    yield from _color_swaps(pixels)
+    # surfarray pixels are indexed [x, y]
+    yield pixels[::-1]
+    yield pixels[:, ::-1]
+
+
+class FlagVariations:
+    """Wrong-but-plausible versions of each flag, built once and then sampled.
+
+    All segment shuffles, colour swaps and mirrors of a flag are composed with
+    NumPy the first time it is asked for, and variants that look the same as
+    the real flag or as each other are dropped by hashing their pixels.
+    """
+
+    def __init__(self, max_entries=VARIATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._variants = OrderedDict()
+
+    def get(self, country, size):
+        key = (country, tuple(size))
+        variants = self._variants.get(key)
+        if variants is not None:
+            self._variants.move_to_end(key)
+            return variants
+
+        variants = self._build(load_flag_image(country, size))
+        self._variants[key] = variants
+        if len(self._variants) > self.max_entries:
+            self._variants.popitem(last=False)
+        return variants
+
+    def sample(self, country, size, count=2):
+        variants = self.get(country, size)
+        return random.sample(variants, min(count, len(variants)))
+
+    def _build(self, flag):
+        import numpy as np
+
+        pixels = pygame.surfarray.array3d(flag)
+        seen = {hashlib.blake2b(pixels.tobytes(), digest_size=16).digest()}
+        variants = []
+        for variant in _flag_variants(pixels):
+            variant = np.ascontiguousarray(variant)
+            digest = hashlib.blake2b(variant.tobytes(), digest_size=16).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            surface = pygame.surfarray.make_surface(variant)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            frame_metrics.count('surface_allocs')
+            variants.append(surface)
+        return variants
+
+
+flag_variations = FlagVariations()
 
-    return correct_flag, incorrect_flags
 # Draw the GUI
 def draw_gui(country, options, option_positions, message=None):
     # Fill the screen background
     screen.fill(WHITE)
 
     # Display the question
-    font = pygame.font.Font(None, 48)
-    question_text = font.render(f"What is the correct flag for {country}?", True, BLACK)
+    question_text = render_text(FONT_MEDIUM, f"What is the correct flag for {country}?", BLACK)
     screen.blit(question_text, (400 - question_text.get_width() // 2, 50))
 
     # Display options in boxes
@@ -181,171 +716,464 @@ def draw_gui(country, options, option_positions, message=None):
 
     # Display message if any
     if message:
-        message_font = pygame.font.Font(None, 36)
-        message_text = message_font.render(message, True, RED if "Incorrect" in message else BLUE)
+        message_text = render_text(FONT, message, RED if "Incorrect" in message else BLUE)
         screen.blit(message_text, (400 - message_text.get_width() // 2, 500))
 
-    pygame.display.flip()
+    display.flip()
     
         
     
     
-def flag_guessing_game():
-    change_background_music(FLAGS_MUSIC_PATH)
-    print("Starting Flag Guessing Game")
-
-    # Load flags background
-    FLAGS_BACKGROUND_PATH = os.path.join('assets', 'flags_background.png')
-    flags_background = pygame.image.load(FLAGS_BACKGROUND_PATH)
-    flags_background = pygame.transform.scale(flags_background, (SCREEN_WIDTH, SCREEN_HEIGHT))
-
-    rounds = 5  # Number of rounds
-    score = 0  # Track correct guesses
-
-    for round_number in range(1, rounds + 1):
-        country = random.choice(country_list)  # Randomly select a country
-        correct_flag = load_flag_image(country)  # Load correct flag image
-
-        # Select two incorrect flags (ensure they are different from the correct one)
-        incorrect_countries = [c for c in country_list if c != country]
-        incorrect_flags = random.sample(incorrect_countries, 2)
-        incorrect_images = [load_flag_image(inc) for inc in incorrect_flags]
-
-        # Combine correct flag with incorrect flags
-        options = [correct_flag] + incorrect_images
-        random.shuffle(options)
-        option_positions = [(200, 300), (400, 300), (600, 300)]  # Positioned in one row
-
-        # Determine the index of the correct flag
-        correct_index = options.index(correct_flag)
-        running = True
-        message = None
-
-        while running:
-            # Draw the flags background
-            screen.blit(flags_background, (0, 0))
-
-            # Draw background panels for question and options
-            draw_panel(screen, pygame.Rect(100, 50, 700, 100), (0, 0, 0, 150))  # Question panel
-            draw_panel(screen, pygame.Rect(100, 250, 700, 200), (0, 0, 0, 100))  # Options panel
-
-            # Display question and score
-            draw_text(f"Round {round_number} / {rounds}", FONT, WHITE, screen, 150, 50, center=False)
-            draw_text(f"Score: {score}", FONT, WHITE, screen, SCREEN_WIDTH - 200, 50, center=False)
-            draw_text(f"What is the flag of {country}?", FONT, YELLOW, screen, SCREEN_WIDTH // 2, 100)
-
-            # Draw the options with hover effect
-            for i, option in enumerate(options):
-                x, y = option_positions[i]
-                rect = pygame.Rect(x, y, 180, 120)
-
-                # Add hover effect with glow
-                if rect.collidepoint(pygame.mouse.get_pos()):
-                    glow_surface = pygame.Surface(rect.size, pygame.SRCALPHA)
-                    pygame.draw.rect(glow_surface, (255, 255, 0, 120), glow_surface.get_rect(), border_radius=15)
-                    screen.blit(glow_surface, rect.topleft)
-                else:
-                    pygame.draw.rect(screen, BLACK, rect, 2, border_radius=15)
-
-                # Center the flag inside the border
-                flag_rect = option.get_rect(center=rect.center)
-                screen.blit(option, flag_rect.topleft)
-
-            # Display feedback message
-            if message:
-                draw_text(message, FONT, RED if "Incorrect" in message else GREEN, screen, SCREEN_WIDTH // 2, 500)
-
-            pygame.display.flip()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = event.pos
-                    for i, (x, y) in enumerate(option_positions):
-                        rect = pygame.Rect(x, y, 180, 120)
-                        if rect.collidepoint(mouse_pos):
-                            if i == correct_index:
-                                message = "Correct!"
-                                score += 1
-                                highlight_box(screen, rect, GREEN)
-                                if correct_sound:
-                                    correct_sound.play()
-                            else:
-                                message = f"Incorrect! The correct answer was: {country}"
-                                highlight_box(screen, rect, RED)
-                                if incorrect_sound:
-                                    incorrect_sound.play()
-                            pygame.time.wait(1500)
-                            running = False
-
-    # End of game summary
-    show_end_screen(score, rounds)
-
-
-
-# Function to show victory or loss screen
-def show_end_screen(score, rounds):
-    # Load end screen background
-    END_BACKGROUND_PATH = os.path.join('assets', 'endBackground.webp')
-    try:
-        end_background = pygame.image.load(END_BACKGROUND_PATH)
-        end_background = pygame.transform.scale(end_background, (SCREEN_WIDTH, SCREEN_HEIGHT))
-    except pygame.error as e:
-        print(f"Error loading {END_BACKGROUND_PATH}: {e}")
-        end_background = None
-
-    # Determine result and colors
-    is_victory = score > rounds // 2
-    message = "Victory! Well Done!" if is_victory else "Game Over! Better Luck Next Time!"
-    box_color = (0, 0, 0, 180)  # Semi-transparent black
-    text_color = (0, 255, 0) if is_victory else (255, 0, 0)  # Green for victory, Red for game over
-
-    if is_victory and victory_sound:
-        victory_sound.play()
-    elif not is_victory and lose_sound:
-        lose_sound.play()
-
-    # Render the end screen
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+WIDGET_GRID_CELL = 64  # Pixels per side of a cell in the widget hit-test grid
+
+
+class Widget:
+    """A clickable part of a scene, laid out once when the scene is built.
+
+    Input sets hovered and the scene sets highlight; nothing is read from
+    the mouse while drawing. state() is what the renderer compares between
+    frames, so a widget is only redrawn when something it shows changed.
+    """
+
+    def __init__(self, rect, on_click=None, sound=None):
+        self.rect = pygame.Rect(rect)
+        self.on_click = on_click
+        self.sound = sound  # Played when clicked, not when drawn
+        self.enabled = True
+        self.hovered = False
+        self.highlight = None  # Colour laid over an answered option
+
+    def state(self):
+        return self.hovered, self.highlight
+
+    def click(self):
+        if self.sound:
+            play_sound(self.sound)
+        if self.on_click:
+            self.on_click()
+
+    def draw(self, surface):
+        pass
+
+
+class Button(Widget):
+    def __init__(self, text, rect, on_click=None, color=EMERALD_GREEN, hover_color=HOVER_EMERALD_GREEN, sound=None):
+        super().__init__(rect, on_click, sound)
+        self.text = text
+        self.color = color
+        self.hover_color = hover_color
+
+    def state(self):
+        return self.hovered, self.text
+
+    def draw(self, surface):
+        draw_button(surface, self.text, self.rect, self.hover_color if self.hovered else self.color)
+
+
+class WidgetLayer:
+    """The widgets of one scene, with a grid index for hit tests.
+
+    Every widget is bucketed into the WIDGET_GRID_CELL cells its rect
+    covers when it is added, so finding the widget under the pointer only
+    checks the one or two widgets of a cell. handle() moves the hover on
+    mouse motion and clicks on a left-button press, so one press fires one
+    action however long the button is held.
+    """
+
+    def __init__(self, widgets=(), cell_size=WIDGET_GRID_CELL):
+        self.cell_size = cell_size
+        self.widgets = []
+        self.hovered = None
+        self._grid = {}
+        for widget in widgets:
+            self.add(widget)
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        rect, size = widget.rect, self.cell_size
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                self._grid.setdefault((cx, cy), []).append(widget)
+        return widget
+
+    def widget_at(self, pos):
+        cell = self._grid.get((pos[0] // self.cell_size, pos[1] // self.cell_size), ())
+        # Later widgets are drawn on top, so they take the click
+        for widget in reversed(cell):
+            if widget.enabled and widget.rect.collidepoint(pos):
+                return widget
+        return None
+
+    def hover(self, pos):
+        widget = None if pos is None else self.widget_at(pos)
+        if widget is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.hovered = False
+            if widget is not None:
+                widget.hovered = True
+            self.hovered = widget
+
+    def handle(self, event):
+        """Route one event; returns the widget it clicked, if any."""
+        if event.type == pygame.MOUSEMOTION:
+            self.hover(event.pos)
+        elif event.type == pygame.WINDOWLEAVE:
+            self.hover(None)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.hover(event.pos)
+            if self.hovered is not None:
+                self.hovered.click()
+                return self.hovered
+        return None
+
+    def update(self):
+        for widget in self.widgets:
+            renderer.track(widget, widget.rect, widget.state())
+
+    def draw(self, surface):
+        # During a partial redraw only the widgets inside the clip are drawn
+        clip = surface.get_clip()
+        for widget in self.widgets:
+            if widget.rect.colliderect(clip):
+                widget.draw(surface)
+
+
+TRANSITION_MS = 700  # Each half of a fade between scenes
+END_SCREEN_FADE_MS = 250  # Also keeps a stray click from reaching the menu
+
+
+class Scene:
+    """One screen of the game, driven by the SceneManager's single loop.
+
+    enter() loads what the scene needs and exit() lets go of it. While the
+    scene is on top, handle(event) sees every event and update() runs once
+    per frame to track the regions that changed before draw() repaints them.
+    A scene covered by a pushed one gets resume(result) when it is back on top.
+    """
+
+    def enter(self):
+        pass
+
+    def exit(self):
+        pass
+
+    def resume(self, result):
+        pass
+
+    def handle(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self):
+        pass
+
+
+class SceneManager:
+    """A stack of scenes run by one top-level loop.
+
+    push(), pop() and replace() take effect once the current frame's events
+    are handled, optionally behind a fade: the last frame fades to black, the
+    stack changes and the new top fades in. Modes never call each other, so a
+    session of any length runs at the same stack depth and every scene that
+    leaves the stack has its exit() hook run.
+    """
+
+    def __init__(self):
+        self.transitions = True  # benchmark.py turns fades off outside its fade scene
+        self._stack = []
+        self._pending = []  # Stack changes requested this frame
+        self._pending_fade = 0
+        self._fade = None  # (draw underneath, overlay) while a fade runs
+
+    @property
+    def top(self):
+        return self._stack[-1] if self._stack else None
+
+    def push(self, scene, fade=0):
+        self._request(lambda: self._push(scene), fade)
+
+    def pop(self, result=None, fade=0):
+        self._request(lambda: self._pop(result), fade)
+
+    def replace(self, scene, fade=0):
+        self._request(lambda: self._replace(scene), fade)
+
+    def fade(self, change, duration=TRANSITION_MS):
+        # Runs change() while the screen is black, e.g. to swap in the next stage
+        self._request(change, duration)
+
+    def _request(self, change, fade):
+        self._pending.append(change)
+        if self.transitions:
+            self._pending_fade = max(self._pending_fade, fade)
+
+    def _push(self, scene):
+        self._stack.append(scene)
+        scene.enter()
+
+    def _pop(self, result):
+        self._stack.pop().exit()
+        if self._stack:
+            self._stack[-1].resume(result)
+
+    def _replace(self, scene):
+        self._stack.pop().exit()
+        self._push(scene)
+
+    def _apply(self, changes):
+        for change in changes:
+            change()
+        renderer.begin_scene()
+        frame_metrics.scene = type(self.top).__name__ if self._stack else None
+
+    def _start_changes(self):
+        changes, self._pending = self._pending, []
+        fade, self._pending_fade = self._pending_fade, 0
+        if not fade:
+            self._apply(changes)
+            return
+
+        snapshot = screen.copy()
+        overlay = _fade_overlay()
+
+        def fade_in():
+            self._apply(changes)
+            if not self._stack:
+                self._fade = None
+                return
+            self._fade = (self.top.draw, overlay)
+            timers.tween(fade, lambda t: overlay.set_alpha(int(255 * (1 - t))), done)
+
+        def done():
+            self._fade = None
+            renderer.begin_scene()
+
+        self._fade = (lambda: screen.blit(snapshot, (0, 0)), overlay)
+        timers.tween(fade, lambda t: overlay.set_alpha(int(255 * t)), fade_in)
+
+    def _draw_fade(self):
+        draw, overlay = self._fade
+        draw()
+        screen.blit(overlay, (0, 0))
+        display.flip()
+
+    def run(self, scene):
+        """Run scene, and whatever it pushes, until the stack is empty."""
+        self._stack, self._pending, self._pending_fade, self._fade = [], [], 0, None
+        self._apply([lambda: self._push(scene)])
+        try:
+            while self._stack:
+                for event in frame_scheduler.poll():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    # Input during a fade, or after a scene asked to leave, is dropped
+                    if self._fade is None and not self._pending:
+                        self.top.handle(event)
+
+                if self._pending and self._fade is None:
+                    self._start_changes()
+                if self._fade is not None:
+                    self._draw_fade()
+                elif self._stack:
+                    self.top.update()
+                    renderer.render(self.top.draw)
+                    startup_profiler.first_frame()
+        finally:
+            while self._stack:
+                self._stack.pop().exit()
+
+
+scenes = SceneManager()
+
+
+class FlagCard(Widget):
+    """One flag option, glowing while hovered."""
+
+    def __init__(self, rect, on_click=None):
+        super().__init__(rect, on_click)
+        self.image = None
+
+    def draw(self, surface):
+        # Add hover effect with glow
+        if self.hovered:
+            surface.blit(surface_pool.panel(self.rect.size, (255, 255, 0, 120), 15), self.rect.topleft)
+        else:
+            pygame.draw.rect(surface, BLACK, self.rect, 2, border_radius=15)
+
+        # Center the flag inside the border
+        if self.image is not None:
+            surface.blit(self.image, self.image.get_rect(center=self.rect.center))
+        if self.highlight:
+            highlight_box(surface, self.rect, self.highlight)
+
+
+FLAG_LOOKALIKE_EVERY = 3  # Every third flag round hides the real flag among altered copies
+
+
+class FlagQuizScene(Scene):
+    """Pick the flag of the named country out of three."""
+
+    OPTION_POSITIONS = [(200, 300), (400, 300), (600, 300)]  # Positioned in one row
+
+    def enter(self):
+        change_background_music(FLAGS_MUSIC_PATH)
+        print("Starting Flag Guessing Game")
+        flag_cache.refresh()
+
+        # Load flags background
+        self.background = load_background(FLAGS_BACKGROUND_PATH)
+        prefetch_next('flags')
+
+        # Rounds, scoring and option selection live in the headless engine
+        self.quiz = flag_quiz()
+        self.state = self.quiz.start()
+        # The cards stay put for the whole game; rounds only swap their flags
+        self.cards = [FlagCard((x, y, 180, 120), functools.partial(self._answer, i))
+                      for i, (x, y) in enumerate(self.OPTION_POSITIONS)]
+        self.widgets = WidgetLayer(self.cards)
+        self.widgets.hover(display.mouse_pos())
+        self._start_round()
+
+    def exit(self):
+        if self.round_over:
+            self.round_over.cancel()
+        self.background = self.cards = self.widgets = None
+        prefetcher.discard('image', FLAGS_BACKGROUND_PATH)
+
+    def _start_round(self):
+        round_state = self.round_state = self.state
+        images = [load_flag_image(option) for option in round_state.options]
+        self.lookalikes = False
+        if round_state.round_number % FLAG_LOOKALIKE_EVERY == 0:
+            # The wrong cards show shuffled, recoloured or mirrored copies of the asked flag
+            variants = flag_variations.sample(round_state.answer, FLAG_SIZE, len(images) - 1)
+            if len(variants) == len(images) - 1:
+                self.lookalikes = True
+                images = [image if option == round_state.answer else variants.pop()
+                          for option, image in zip(round_state.options, images)]
+        for card, image in zip(self.cards, images):
+            card.image = image
+            card.highlight = None
+        self.message = None
+        self.round_over = None  # Timer that ends the round
+        self.shown_at = time.perf_counter()
+        # Each round starts from a clean frame; afterwards only hovered cards change
+        renderer.begin_scene()
+
+    def _end_round(self):
+        if not self.state.finished:
+            self._start_round()
+            return
+        # End of game summary
+        results_log.session('flags', self.state.score, self.state.rounds)
+        scenes.replace(EndScreen(self.state.score, self.state.rounds))
+
+    def _answer(self, i):
+        if self.round_over is not None:
+            return  # Already answered; the feedback is showing
+        self.state = self.quiz.step(self.round_state, Answer(self.round_state.options[i]))
+        record_answer('flags', self.round_state.prompt, self.state.last_correct, self.shown_at)
+        if self.state.last_correct:
+            self.message = "Correct!"
+            self.cards[i].highlight = GREEN
+            play_sound(CORRECT_SOUND_PATH)
+        else:
+            self.message = f"Incorrect! The correct answer was: {self.round_state.prompt}"
+            self.cards[i].highlight = RED
+            play_sound(INCORRECT_SOUND_PATH)
+        self.round_over = timers.after(FEEDBACK_MS, self._end_round)
+
+    def handle(self, event):
+        self.widgets.handle(event)
+
+    def update(self):
+        self.widgets.update()
+        renderer.track('message', (0, 470, SCREEN_WIDTH, 60), self.message)
+
+    def draw(self):
+        round_state = self.round_state
+
+        # Draw the flags background
+        if self.background:
+            screen.blit(self.background, (0, 0))
+        else:
+            screen.fill(DARK_BLUE)
+
+        # Draw background panels for question and options
+        draw_panel(screen, pygame.Rect(100, 50, 700, 100), (0, 0, 0, 150))  # Question panel
+        draw_panel(screen, pygame.Rect(100, 250, 700, 200), (0, 0, 0, 100))  # Options panel
+
+        # Display question and score
+        draw_text(f"Round {round_state.round_number} / {round_state.rounds}", FONT, WHITE, screen, 150, 50, center=False)
+        draw_text(f"Score: {round_state.score}", FONT, WHITE, screen, SCREEN_WIDTH - 200, 50, center=False)
+        question = "Which is the real flag of" if self.lookalikes else "What is the flag of"
+        draw_text(f"{question} {round_state.prompt}?", FONT, YELLOW, screen, SCREEN_WIDTH // 2, 100)
+
+        # Draw the options with hover effect
+        self.widgets.draw(screen)
+
+        # Display feedback message
+        if self.message:
+            draw_text(self.message, FONT, RED if "Incorrect" in self.message else GREEN, screen, SCREEN_WIDTH // 2, 500)
+
+
+
+class EndScreen(Scene):
+    """Victory or game-over card after a mode; any key or click goes back.
+
+    The (score, rounds) pair is handed to the scene underneath, so a scene
+    that pushed the mode can add it up.
+    """
+
+    def __init__(self, score, rounds, background=None, label="Final Score", is_victory=None):
+        self.score = score
+        self.rounds = rounds
+        self.background = background
+        self.label = label
+        self.is_victory = score > rounds // 2 if is_victory is None else is_victory
+
+    def enter(self):
+        # Load end screen background, unless the mode handed over its own
+        if self.background is None:
+            self.background = load_background(END_BACKGROUND_PATH)
+        play_sound(VICTORY_SOUND_PATH if self.is_victory else LOSE_SOUND_PATH)
+
+    def exit(self):
+        self.background = None
+        prefetcher.discard('image', END_BACKGROUND_PATH)
+
+    def handle(self, event):
+        # Wait for user input to exit the screen
+        if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+            scenes.pop((self.score, self.rounds), fade=END_SCREEN_FADE_MS)
+
+    def draw(self):
+        # Determine result and colors
+        message = "Victory! Well Done!" if self.is_victory else "Game Over! Better Luck Next Time!"
+        box_color = (0, 0, 0, 180)  # Semi-transparent black
+        text_color = (0, 255, 0) if self.is_victory else (255, 0, 0)  # Green for victory, Red for game over
 
         # Draw background
-        if end_background:
-            screen.blit(end_background, (0, 0))
+        if self.background:
+            screen.blit(self.background, (0, 0))
         else:
             screen.fill(DARK_BLUE)  # Fallback if image is missing
 
         # Draw translucent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        pygame.draw.rect(overlay, box_color, (SCREEN_WIDTH // 2 - 300, SCREEN_HEIGHT // 2 - 150, 600, 300), border_radius=20)
-        screen.blit(overlay, (0, 0))
+        screen.blit(surface_pool.panel((600, 300), box_color, 20), (SCREEN_WIDTH // 2 - 300, SCREEN_HEIGHT // 2 - 150))
 
         # Display result message
         draw_text(message, FONT_MEDIUM, text_color, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 70)
 
         # Display final score
-        draw_text(f"Final Score: {score} / {rounds}", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20)
+        draw_text(f"{self.label}: {self.score} / {self.rounds}", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20)
 
         # Display "Press any key to continue" message
         draw_text("Press any key to continue", FONT_SMALL, GRAY, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100)
 
-        pygame.display.update()
-
-        # Wait for user input to exit the screen
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                running = False
-                break
-
-    pygame.time.wait(500)
-
 
 
 # def show_end_screen(score, rounds, background_path):
@@ -412,166 +1240,625 @@ PANEL_COLOR = (0, 0, 0, 180)  # Semi-transparent black panel
 
 # Attempt to load sound effects (optional)
 CORRECT_SOUND_PATH = os.path.join('assets', 'sounds', 'CorrectAnswer.mp3')
-INCORRECT_SOUND_PATH = os.path.join('assets', 'sounds', 'incorrect.mp3')
+INCORRECT_SOUND_PATH = os.path.join('assets', 'sounds', 'Incorrect.mp3')
 CLICK_SOUND_PATH = os.path.join('assets', 'sounds', 'Click.mp3')
 VICTORY_SOUND_PATH = os.path.join('assets', 'sounds', 'Victory.mp3')
 LOSE_SOUND_PATH = os.path.join('assets', 'sounds', 'Sad2.mp3')
 
 
 def load_sound(path):
-    if os.path.exists(path):
-        return pygame.mixer.Sound(path)
-    else:
-        print(f"Sound file not found at {path}")
-        return None
-
-correct_sound = load_sound(CORRECT_SOUND_PATH)
-incorrect_sound = load_sound(INCORRECT_SOUND_PATH)
-click_sound = load_sound(CLICK_SOUND_PATH)
-victory_sound = load_sound(VICTORY_SOUND_PATH)
-lose_sound = load_sound(LOSE_SOUND_PATH)
-draw_sound = None  # Define draw_sound to avoid undefined error
-
-# A utility function to safely load images
-def load_flag_image(country, size=(100, 60)):
-    image_path = os.path.join('assets', 'Flags', f'{country}.png')
-    if not os.path.exists(image_path):
-        print(f"Warning: Image file not found for {country} at {image_path}. Using fallback.")
-        fallback_surface = pygame.Surface(size)
-        fallback_surface.fill(RED)
-        return fallback_surface
-    
-    try:
-        img = pygame.image.load(image_path)
-        img = pygame.transform.scale(img, size)
-        return img
-    except (pygame.error, FileNotFoundError) as e:
-        print(f"Warning: Could not load image for {country}. Using fallback surface. Error: {e}")
-        fallback_surface = pygame.Surface(size)
-        fallback_surface.fill(RED)
-        return fallback_surface
-
-# Flag to country mapping
-country_list = [
-    'Palestine', 'Jordan', 'Syria', 'Egypt', 'USA',
-    'France', 'Germany', 'Italy', 'Spain', 'UK',
-    'India', 'China', 'Japan', 'South Korea', 'Russia',
-    'Canada', 'Brazil', 'Mexico', 'Argentina', 'Australia',
-    'South Africa', 'Nigeria', 'Kenya', 'Morocco'
+    with startup_profiler.phase('audio decode'):
+        if bundle:
+            sound = bundle.sound(path)
+            if sound:
+                return sound
+        if not os.path.exists(path):
+            print(f"Sound file not found at {path}")
+            return None
+        try:
+            return pygame.mixer.Sound(path)
+        except pygame.error as e:
+            print(f"Error loading sound {path}: {e}")
+            return None
+
+
+MUSIC_VOLUME = 0.5  # 0.0 to 1.0
+MUSIC_FADE_MS = 600  # Each half of a crossfade between mode tracks
+# Effects play on reserved channels that pygame never hands out on its own.
+# Clicks get their own, so a click never cuts off an answer's feedback.
+CLICK_CHANNEL = 0
+FEEDBACK_CHANNEL = 1
+RESERVED_CHANNELS = 2
+EFFECT_CHANNELS = {CLICK_SOUND_PATH: CLICK_CHANNEL}
+
+
+class AudioManager:
+    """Background music and sound effects that never block the frame loop.
+
+    Effects are decoded the first time they are played and then cached.
+    Changing the track fades the current one out and the new one in; the
+    mixer runs both fades on its own thread, and the swap in between happens
+    in update(), which the frame scheduler calls every frame and wakes up for.
+    Without an audio device every call is a no-op.
+    """
+
+    def __init__(self):
+        self.track = None  # Playing or fading in
+        self._sounds = {}
+        self._channels = None
+        self._next = None  # Waiting for the current track to fade out
+        self._switch_at = None  # get_ticks() at which the fade-out is over
+
+    def _ready(self):
+        if pygame.mixer.get_init() is None:
+            return False
+        if self._channels is None:
+            pygame.mixer.set_reserved(RESERVED_CHANNELS)
+            self._channels = [pygame.mixer.Channel(i) for i in range(RESERVED_CHANNELS)]
+        return True
+
+    def play_music(self, path):
+        if not os.path.exists(path):
+            print(f"Warning: Music file not found at {path}")
+            return
+        # Modes that share a track keep it playing instead of restarting it
+        if path == (self._next or self.track) or not self._ready():
+            return
+        if self.track is None or not pygame.mixer.music.get_busy():
+            self._start(path)
+            return
+        if self._next is None:
+            pygame.mixer.music.fadeout(MUSIC_FADE_MS)
+            self._switch_at = pygame.time.get_ticks() + MUSIC_FADE_MS
+        self._next = path
+
+    def _start(self, path):
+        # The prefetched read only warms the OS file cache. Streaming from the
+        # bytes themselves would make the mixer thread call back into Python,
+        # which crashes under tracemalloc (see benchmark.py).
+        prefetcher.get('music', path)
+        with startup_profiler.phase('audio decode'):
+            pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(MUSIC_VOLUME)
+        pygame.mixer.music.play(-1, fade_ms=MUSIC_FADE_MS if self.track else 0)  # Loop indefinitely
+        self.track, self._next, self._switch_at = path, None, None
+
+    def update(self):
+        if self._next is not None and pygame.time.get_ticks() >= self._switch_at:
+            self._start(self._next)
+
+    def idle_timeout(self, timeout):
+        # Idle frames sleep at most until the next track is due
+        if self._next is None:
+            return timeout
+        return max(1, min(timeout, self._switch_at - pygame.time.get_ticks()))
+
+    def play_sound(self, path):
+        if not self._ready():
+            return
+        if path not in self._sounds:
+            self._sounds[path] = load_sound(path)
+        sound = self._sounds[path]
+        if sound:
+            self._channels[EFFECT_CHANNELS.get(path, FEEDBACK_CHANNEL)].play(sound)
+
+
+audio = AudioManager()
+
+
+def play_sound(path):
+    audio.play_sound(path)
+
+
+class DirtyRenderer:
+    """Sends only the parts of the screen that changed to the display.
+
+    Scenes describe regions with track(key, rect, state). When a region's state
+    changes, render() redraws the scene clipped to that region and pushes it
+    with display.update(rects). begin_scene() forces a full redraw and
+    is called whenever a scene or round starts.
+    """
+
+    def __init__(self):
+        self.full = True
+        self.presented = True
+        self._states = {}
+        self._dirty = []
+
+    def begin_scene(self):
+        self.full = True
+        self._states.clear()
+
+    def track(self, key, rect, state):
+        rect = pygame.Rect(rect)
+        previous = self._states.get(key)
+        if previous != (rect, state):
+            if previous is not None:
+                self._dirty.append(previous[0])
+            self._dirty.append(rect)
+            self._states[key] = (rect, state)
+
+    def mark(self, rect):
+        self._dirty.append(pygame.Rect(rect))
+
+    def render(self, draw):
+        # Returns whether anything reached the display this frame
+        frame_metrics.render_started()
+        self.presented = self._present(draw)
+        frame_metrics.render_finished()
+        return self.presented
+
+    def _present(self, draw):
+        overlay = frame_metrics.visible
+        if self.full:
+            draw()
+            if overlay:
+                frame_metrics.draw_overlay()
+            display.flip()
+            self.full = False
+            self._dirty.clear()
+            return True
+        if not self._dirty and not overlay:
+            return False
+
+        rects = _merge_rects(self._dirty)
+        self._dirty.clear()
+        for rect in rects:
+            screen.set_clip(rect)
+            draw()
+        screen.set_clip(None)
+        frame_metrics.count('dirty_rects', len(rects))
+        if overlay:
+            rects.append(frame_metrics.draw_overlay())
+        display.update(rects)
+        return True
+
+
+def _merge_rects(rects):
+    # Union overlapping rects so no pixel is redrawn twice in one frame
+    merged = []
+    for rect in rects:
+        rect = rect.clip(screen.get_rect())
+        if not rect:
+            continue
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+renderer = DirtyRenderer()
+
+METRICS_HOTKEY = pygame.K_F3
+METRICS_PATH = 'metrics.jsonl'
+METRICS_OVERLAY_RECT = (SCREEN_WIDTH - 250, SCREEN_HEIGHT - 210, 240, 200)
+# Helpers whose calls and time are counted; the draw_* ones and highlight_box are draw calls
+METRICS_HELPERS = [
+    'draw_text', 'draw_text_with_shadow', 'draw_button', 'draw_health_bar', 'draw_panel',
+    'highlight_box', 'draw_gradient_box', 'draw_background', 'render_text',
+    'load_flag_image', 'load_background', 'play_sound',
 ]
 
-# Load images for flags
-flag_images = {}
-for country in country_list:
-    flag_images[country] = load_flag_image(country)
-
-# Stage data
-stage_data = [
-    {
-        'flags': ['Palestine', 'Jordan', 'Syria', 'Egypt', 'USA'],
-        'capitals': {
-            'Palestine': 'Jerusalem',
-            'Jordan': 'Amman',
-            'Syria': 'Damascus',
-            'Egypt': 'Cairo',
-            'USA': 'Washington D.C.'
-        }
-    },
-    {
-        'flags': ['France', 'Germany', 'Italy', 'Spain', 'UK'],
-        'capitals': {
-            'France': 'Paris',
-            'Germany': 'Berlin',
-            'Italy': 'Rome',
-            'Spain': 'Madrid',
-            'UK': 'London'
-        }
-    },
-    {
-        'flags': ['India', 'China', 'Japan', 'South Korea', 'Russia'],
-        'capitals': {
-            'India': 'New Delhi',
-            'China': 'Beijing',
-            'Japan': 'Tokyo',
-            'South Korea': 'Seoul',
-            'Russia': 'Moscow'
+
+class FrameMetrics:
+    """Opt-in per-frame counters for finding the scene that blows the frame budget.
+
+    enable() wraps the helpers in METRICS_HELPERS so their calls and time are
+    counted, and the caches report font renders, surface allocations and image
+    loads through count(). Every finished frame is appended to a JSON-lines
+    file and the latest one is shown in an overlay toggled with F3.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.visible = False
+        self.scene = None
+        self.frame = 0
+        self.last = {}
+        self._file = None
+        self._font = None
+        self._counts = Counter()
+        self._times = Counter()
+        self._frame_start = time.perf_counter()
+        self._render_start = None
+
+    def enable(self, path=METRICS_PATH):
+        self.enabled = True
+        if path:
+            self._file = open(path, 'w')
+            atexit.register(self._file.close)
+        module = globals()
+        for name in METRICS_HELPERS:
+            module[name] = self._wrap(name, module[name])
+
+    def _wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._counts[name] += 1
+                self._times[name] += time.perf_counter() - start
+
+        return wrapper
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self._counts[name] += n
+
+    def start_frame(self):
+        self._frame_start = time.perf_counter()
+
+    def render_started(self):
+        # Everything between the end of the frame wait and rendering is event handling
+        if self.enabled:
+            self._render_start = time.perf_counter()
+            self._times['events'] += self._render_start - self._frame_start
+
+    def render_finished(self):
+        if self.enabled:
+            self._times['render'] += time.perf_counter() - self._render_start
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        counts, times = self._counts, self._times
+        calls = {name: counts[name] for name in METRICS_HELPERS if counts[name]}
+        self.last = {
+            'frame': self.frame,
+            'scene': self.scene,
+            'frame_ms': round((time.perf_counter() - self._frame_start) * 1000, 3),
+            'events_ms': round(times['events'] * 1000, 3),
+            'render_ms': round(times['render'] * 1000, 3),
+            'draw_calls': sum(n for name, n in calls.items() if name.startswith('draw_') or name == 'highlight_box'),
+            'font_renders': counts['font_renders'],
+            'surface_allocs': counts['surface_allocs'],
+            'image_loads': counts['image_loads'],
+            'dirty_rects': counts['dirty_rects'],
+            'calls': calls,
+            'helper_ms': {name: round(times[name] * 1000, 3) for name in calls},
         }
-    },
-    {
-        'flags': ['Canada', 'Brazil', 'Mexico', 'Argentina', 'Australia'],
-        'capitals': {
-            'Canada': 'Ottawa',
-            'Brazil': 'Brasília',
-            'Mexico': 'Mexico City',
-            'Argentina': 'Buenos Aires',
-            'Australia': 'Canberra'
+        counts.clear()
+        times.clear()
+        self.frame += 1
+        if self._file:
+            self._file.write(json.dumps(self.last) + '\n')
+
+    def handle(self, events):
+        # The hotkey is swallowed so scenes waiting for "any key" don't react to it
+        if not self.enabled:
+            return events
+        kept = []
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == METRICS_HOTKEY:
+                self.visible = not self.visible
+                renderer.mark(METRICS_OVERLAY_RECT)
+            else:
+                kept.append(event)
+        return kept
+
+    def draw_overlay(self):
+        # Rendered straight from the font so the overlay never churns the text cache
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+        rect = pygame.Rect(METRICS_OVERLAY_RECT)
+        screen.fill(BLACK, rect)
+        last = self.last
+        lines = [
+            f"{last.get('scene')}  frame {last.get('frame', 0)}",
+            f"frame {last.get('frame_ms', 0):.2f} ms",
+            f"events {last.get('events_ms', 0):.2f}  render {last.get('render_ms', 0):.2f} ms",
+            f"draw calls {last.get('draw_calls', 0)}  dirty rects {last.get('dirty_rects', 0)}",
+            f"font renders {last.get('font_renders', 0)}",
+            f"surface allocs {last.get('surface_allocs', 0)}",
+            f"image loads {last.get('image_loads', 0)}",
+            "flag cache {hits} hits  {misses} misses".format(**flag_cache.stats()),
+            "text cache {hits} hits  {misses} misses".format(**text_cache.stats()),
+        ]
+        for i, line in enumerate(lines):
+            screen.blit(self._font.render(line, True, WHITE), (rect.x + 8, rect.y + 8 + i * 20))
+        return rect
+
+
+frame_metrics = FrameMetrics()
+
+# Every answer and finished mode goes to the results log once main() opened it
+results_log = ResultsLog()
+
+
+def record_answer(mode, country, correct, shown_at):
+    # Response time runs from when the question was shown
+    results_log.answer(mode, country, correct, (time.perf_counter() - shown_at) * 1000)
+
+
+FPS_CAP = 60
+IDLE_TIMEOUT_MS = 250  # Longest idle sleep, so timed updates still get a frame
+FEEDBACK_MS = 1500  # How long an answer's feedback stays up before the next round
+
+
+class Timer:
+    __slots__ = ('due', 'callback', 'fired', 'cancelled')
+
+    def __init__(self, due, callback):
+        self.due = due
+        self.callback = callback
+        self.fired = False
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return self.due < other.due
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Tween:
+    __slots__ = ('start', 'duration', 'update', 'done', 'finished', 'cancelled')
+
+    def __init__(self, start, duration, update, done):
+        self.start = start
+        self.duration = duration
+        self.update = update
+        self.done = done
+        self.finished = False
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Timers:
+    """Delays and animations advanced by the frame scheduler instead of sleeping.
+
+    after(ms, callback) fires once, ms from now. tween(ms, update, done) calls
+    update(t) every frame with t going from 0 to 1, then done(). Both return
+    a handle whose fired/finished flag a loop can check, so a scene keeps
+    pumping events and drawing while it waits. Running tweens keep frames
+    coming; pending timers only shorten the idle sleep to their due time.
+    """
+
+    def __init__(self):
+        self._timers = []  # Heap ordered by due time
+        self._tweens = []
+
+    def after(self, duration, callback=None):
+        timer = Timer(pygame.time.get_ticks() + duration, callback)
+        heapq.heappush(self._timers, timer)
+        return timer
+
+    def tween(self, duration, update, done=None):
+        tween = Tween(pygame.time.get_ticks(), max(duration, 1), update, done)
+        update(0.0)
+        self._tweens.append(tween)
+        return tween
+
+    @property
+    def animating(self):
+        return bool(self._tweens)
+
+    def idle_timeout(self, timeout):
+        while self._timers and self._timers[0].cancelled:
+            heapq.heappop(self._timers)
+        if not self._timers:
+            return timeout
+        return max(1, min(timeout, self._timers[0].due - pygame.time.get_ticks()))
+
+    def update(self):
+        now = pygame.time.get_ticks()
+        while self._timers and self._timers[0].due <= now:
+            timer = heapq.heappop(self._timers)
+            if timer.cancelled:
+                continue
+            timer.fired = True
+            if timer.callback:
+                timer.callback()
+
+        if self._tweens:
+            running = []
+            for tween in self._tweens:
+                if tween.cancelled:
+                    continue
+                t = min((now - tween.start) / tween.duration, 1.0)
+                tween.update(t)
+                if t < 1.0:
+                    running.append(tween)
+                    continue
+                tween.finished = True
+                if tween.done:
+                    tween.done()
+            self._tweens = running
+
+
+timers = Timers()
+
+
+class FrameScheduler:
+    """Paces the game loops and sleeps through frames where nothing changes.
+
+    While the last frame pushed something to the display (or a scene asked to
+    keep_awake() for an animation, or a tween is running) loops run at no more
+    than the FPS cap. Otherwise poll() blocks on pygame.event.wait until input
+    arrives or the next timer is due.
+    """
+
+    def __init__(self, fps=FPS_CAP):
+        self.fps = fps
+        self.clock = pygame.time.Clock()
+        self._awake = False
+
+    def keep_awake(self):
+        # Animating scenes call this every frame to keep frames coming
+        self._awake = True
+
+    def tick(self):
+        frame_metrics.end_frame()
+        elapsed = self.clock.tick(self.fps)
+        audio.update()
+        timers.update()
+        frame_metrics.start_frame()
+        return elapsed
+
+    def poll(self):
+        surface_pool.end_frame()
+        awake, self._awake = self._awake, False
+        if awake or renderer.presented or timers.animating:
+            self.tick()
+            return display.handle(frame_metrics.handle(pygame.event.get()))
+
+        frame_metrics.end_frame()
+        event = pygame.event.wait(timers.idle_timeout(audio.idle_timeout(IDLE_TIMEOUT_MS)))
+        self.clock.tick()
+        audio.update()
+        timers.update()
+        frame_metrics.start_frame()
+        if event.type == pygame.NOEVENT:
+            return []
+        return display.handle(frame_metrics.handle([event] + pygame.event.get()))
+
+
+frame_scheduler = FrameScheduler()
+
+TEXT_CACHE_SIZE = 256  # Rendered strings kept before evicting
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by (font, text, color, antialias).
+
+    Labels rarely change between frames, so most draws reuse a surface instead
+    of calling font.render. Returned surfaces are shared and must not be drawn on.
+    """
+
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        frame_metrics.count('font_renders')
+        frame_metrics.count('surface_allocs')
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._surfaces),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
         }
-    },
-    {
-        'flags': ['South Africa', 'Egypt', 'Nigeria', 'Kenya', 'Morocco'],
-        'capitals': {
-            'South Africa': 'Cape Town',
-            'Egypt': 'Cairo',
-            'Nigeria': 'Abuja',
-            'Kenya': 'Nairobi',
-            'Morocco': 'Rabat'
+
+
+text_cache = TextCache()
+
+
+def render_text(font, text, color, antialias=True):
+    return text_cache.render(font, text, color, antialias)
+
+
+SURFACE_POOL_SIZE = 128  # Composed surfaces kept before evicting
+
+
+class SurfacePool:
+    """Translucent panels and overlays, composed once and reused every frame.
+
+    get() builds a surface the first time its key is requested. allocations
+    counts every surface built so far and last_frame_allocations those built
+    during the previous frame, which stays at zero once a scene has settled.
+    """
+
+    def __init__(self, max_entries=SURFACE_POOL_SIZE):
+        self.max_entries = max_entries
+        self.allocations = 0
+        self.frame_allocations = 0
+        self.last_frame_allocations = 0
+        self._surfaces = OrderedDict()
+
+    def get(self, key, build):
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+
+        surface = build()
+        frame_metrics.count('surface_allocs')
+        self.allocations += 1
+        self.frame_allocations += 1
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def panel(self, size, color, border_radius=0):
+        def build():
+            panel = pygame.Surface(size, pygame.SRCALPHA)
+            if border_radius:
+                pygame.draw.rect(panel, color, panel.get_rect(), border_radius=border_radius)
+            else:
+                panel.fill(color)
+            return panel
+
+        return self.get(('panel', tuple(size), tuple(color), border_radius), build)
+
+    def end_frame(self):
+        self.last_frame_allocations = self.frame_allocations
+        self.frame_allocations = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._surfaces),
+            'allocations': self.allocations,
+            'last_frame_allocations': self.last_frame_allocations,
         }
-    }
-]
 
-stage_data.append({
-    'monuments': {
-        'Palestine': 'Dome of the Rock',
-        'France': 'Eiffel Tower',
-        'India': 'Taj Mahal',
-        'USA': 'Statue of Liberty',
-        'Egypt': 'Great Pyramid of Giza',
-        'China': 'Great Wall of China',
-        'Italy': 'Colosseum',
-        'UK': 'Big Ben',
-        'Brazil': 'Christ the Redeemer',
-        'Australia': 'Sydney Opera House'
-    }
-})
-
-# Initialize screen
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Flags and Capitals Game")
+
+surface_pool = SurfacePool()
+
 
 # Utility functions
 def draw_text(text, font, color, surface, x, y, center=True, shadow=True):
     # Draw text with an optional shadow for better readability
     if shadow:
         shadow_offset = 2
-        text_shadow = font.render(text, True, BLACK)
+        text_shadow = render_text(font, text, BLACK)
         if center:
             rect = text_shadow.get_rect(center=(x, y))
         else:
             rect = text_shadow.get_rect(topleft=(x, y))
         surface.blit(text_shadow, (rect.x+shadow_offset, rect.y+shadow_offset))
 
-    text_obj = font.render(text, True, color)
+    text_obj = render_text(font, text, color)
     if center:
         text_rect = text_obj.get_rect(center=(x, y))
     else:
         text_rect = text_obj.get_rect(topleft=(x, y))
     surface.blit(text_obj, text_rect)
 
-def draw_button(surface, text, x, y, w, h, inactive_color, active_color, action=None):
-    mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
-    rect = pygame.Rect(x, y, w, h)
-    hover = rect.collidepoint(mouse)
-
-    color = active_color if hover else inactive_color
+def draw_button(surface, text, rect, color):
+    # Draw button with rounded corners
     pygame.draw.rect(surface, color, rect, border_radius=12)
 
-    draw_text(text, FONT, BLACK, surface, x + w // 2, y + h // 2)
+    # Draw button text
+    draw_text(text, FONT, WHITE, surface, rect.centerx, rect.centery)
 
-    if hover and click[0] == 1 and action:
-        if click_sound:
-            click_sound.play()
-        action()
 
 def draw_health_bar(lives):
     draw_text(f'Lives: {lives}', FONT, WHITE, screen, SCREEN_WIDTH - 200, 40, center=False, shadow=False)
@@ -580,231 +1867,224 @@ def draw_health_bar(lives):
 
 def draw_panel(surface, rect, color=PANEL_COLOR):
     # Draw a semi-transparent panel to highlight content
-    panel = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-    panel.fill(color)
-    surface.blit(panel, rect.topleft)
-
-def fade_in(duration=500):
-    # Fade-in effect for a smoother transition
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    overlay.fill(BLACK)
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        alpha = 255 - (elapsed / duration * 255)
-        if alpha < 0:
-            alpha = 0
-        overlay.set_alpha(alpha)
-        draw_background()
-        screen.blit(overlay, (0, 0))
-        pygame.display.flip()
-        if elapsed >= duration:
-            break
-
-def fade_out(duration=500):
-    # Fade-out effect for a smoother transition
-    overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    overlay.fill(BLACK)
-    start_time = pygame.time.get_ticks()
-    while True:
-        elapsed = pygame.time.get_ticks() - start_time
-        alpha = int((elapsed / duration) * 255)
-        if alpha > 255:
-            alpha = 255
-        overlay.set_alpha(alpha)
-        screen.blit(overlay, (0, 0))
-        pygame.display.flip()
-        if elapsed >= duration:
-            break
+    surface.blit(surface_pool.panel(rect.size, color), rect.topleft)
+
+def _fade_overlay():
+    def build():
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        overlay.fill(BLACK)
+        return overlay
+
+    return surface_pool.get('fade', build)
 
 def draw_background():
+    global background_image
+    if background_image is None:
+        # False marks a background that failed to load so it is not retried
+        background_image = load_background(BG_IMAGE_PATH) or False
     if background_image:
         screen.blit(background_image, (0, 0))
     else:
         screen.fill(DARK_BLUE)
 
-def level(stage_index=0, total_score=0):
-    # Load the background image
-    level_bg = os.path.join('assets', 'background.png')
-    bg_image = None
-    if os.path.exists(level_bg):
-        try:
-            bg_image = pygame.image.load(level_bg)
-            bg_image = pygame.transform.scale(bg_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-        except pygame.error as e:
-            print(f"Error loading background image: {e}")
-    
-    change_background_music(CAPITALS_MUSIC_PATH)
-    if 'flags' not in stage_data[stage_index]:
-        print(f"Error: Stage {stage_index} does not contain 'flags'.")
-        return total_score
-
-    current_stage = stage_data[stage_index]
-    flags = current_stage['flags']
-    capitals = current_stage['capitals']
-
-    fade_in(700)
-
-    lives = 2
-    correct_matches = 0
-    total_matches = len(flags)
-    selected_flag = None
-
-    flag_positions = []
-    for idx, country in enumerate(flags):
-        x = 100
-        y = 150 + idx * 80
-        flag_positions.append((country, pygame.Rect(x, y, 100, 60)))
-
-    capital_positions = []
-    shuffled_capitals = list(capitals.values())
-    random.shuffle(shuffled_capitals)
-    for idx, capital in enumerate(shuffled_capitals):
-        x = 600
-        y = 150 + idx * 80
-        text_surf = FONT.render(capital, True, WHITE)
-        capital_positions.append((capital, pygame.Rect(x, y, text_surf.get_width(), text_surf.get_height())))
-
-    matched_lines = []
-
-    def draw_gradient_line(surface, start_pos, end_pos, color_start, color_end, width):
-        x1, y1 = start_pos
-        x2, y2 = end_pos
-        for i in range(0, 101, 2):
-            alpha = i / 100
-            x = x1 + (x2 - x1) * alpha
-            y = y1 + (y2 - y1) * alpha
-            color = (
-                int(color_start[0] + (color_end[0] - color_start[0]) * alpha),
-                int(color_start[1] + (color_end[1] - color_start[1]) * alpha),
-                int(color_start[2] + (color_end[2] - color_start[2]) * alpha),
-            )
-            pygame.draw.circle(surface, color, (int(x), int(y)), width // 2)
-
-    def display_end_of_round(message, color):
-        """Displays end-of-round screen with the same visuals."""
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                    running = False
-
-            # Draw the background
-            if bg_image:
-                screen.blit(bg_image, (0, 0))
-            else:
-                screen.fill(DARK_BLUE)
+def draw_gradient_line(surface, start_pos, end_pos, color_start, color_end, width):
+    x1, y1 = start_pos
+    x2, y2 = end_pos
+    for i in range(0, 101, 2):
+        alpha = i / 100
+        x = x1 + (x2 - x1) * alpha
+        y = y1 + (y2 - y1) * alpha
+        color = (
+            int(color_start[0] + (color_end[0] - color_start[0]) * alpha),
+            int(color_start[1] + (color_end[1] - color_start[1]) * alpha),
+            int(color_start[2] + (color_end[2] - color_start[2]) * alpha),
+        )
+        pygame.draw.circle(surface, color, (int(x), int(y)), width // 2)
+
+
+class CapitalsScene(Scene):
+    """Match each flag of a stage with its capital; later stages reuse the scene."""
+
+    def __init__(self, stage_index=0):
+        self.stage_index = stage_index
+        self.state = None
+
+    def enter(self):
+        # Loaded once for every stage of the match
+        self.background = load_background(BG_IMAGE_PATH)
+        flag_cache.refresh()
+        prefetch_next('capitals')
+
+        change_background_music(CAPITALS_MUSIC_PATH)
+
+        # Lives, matching and stage advancement live in the headless engine
+        self.game = CapitalsGame()
+        if self.stage_index >= len(self.game.stages):
+            print(f"Error: Stage {self.stage_index} does not contain 'flags'.")
+            scenes.pop()
+            return
+        self._start_stage(self.game.start(self.stage_index))
+
+    def exit(self):
+        self.background = self.lines_layer = None
+        prefetcher.discard('image', BG_IMAGE_PATH)
+
+    def _start_stage(self, state):
+        self.state = state
+        self.summary = None  # (message, color) once the stage is over
+        self.shown_at = time.perf_counter()  # Start of the current match attempt
+
+        self.flag_rects = {country: pygame.Rect(100, 150 + idx * 80, 100, 60)
+                           for idx, country in enumerate(state.flags)}
+        self.capital_rects = {}
+        for idx, capital in enumerate(state.capitals):
+            text_surf = render_text(FONT, capital, WHITE)
+            self.capital_rects[capital] = pygame.Rect(600, 150 + idx * 80, text_surf.get_width(), text_surf.get_height())
+        self.matched_lines = []
+
+        self.flags_panel = pygame.Rect(80, 130, 150, (len(state.flags) * 80) + 40)
+        self.capitals_panel = pygame.Rect(580, 130, 250, (len(state.capitals) * 80) + 40)
+
+        # Matched lines are drawn once into this layer, which is blitted every frame
+        self.lines_area = self.flags_panel.union(self.capitals_panel)
+        self.lines_layer = pygame.Surface(self.lines_area.size, pygame.SRCALPHA)
+        renderer.begin_scene()
+
+    def _show_summary(self, message, color):
+        self.summary = (message, color)
+        renderer.begin_scene()
+
+    def _next_stage(self):
+        self._start_stage(self.game.step(self.state, NextStage()))
+
+    def handle(self, event):
+        state = self.state
+        if self.summary:
+            if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+                if state.status == STAGE_COMPLETE:
+                    scenes.fade(self._next_stage)
+                else:
+                    max_score = sum(len(stage['flags']) for stage in self.game.stages)
+                    results_log.session('capitals', state.score, max_score)
+                    scenes.pop((state.score, max_score))
+            return
+        if event.type != pygame.MOUSEBUTTONDOWN:
+            return
+
+        for country in state.remaining_flags:
+            if self.flag_rects[country].collidepoint(event.pos):
+                self.state = self.game.step(self.state, SelectFlag(country))
+
+        for capital in self.state.remaining_capitals:
+            if self.capital_rects[capital].collidepoint(event.pos) and self.state.selected_flag:
+                country = self.state.selected_flag
+                self.state = self.game.step(self.state, ChooseCapital(capital))
+                record_answer('capitals', country, self.state.last_correct, self.shown_at)
+                self.shown_at = time.perf_counter()
+                if self.state.last_correct:
+                    play_sound(CORRECT_SOUND_PATH)
+                    self._draw_match(country, capital)
+
+                    if self.state.status == STAGE_COMPLETE:
+                        scenes.fade(lambda: self._show_summary("Round Complete!", GREEN))
+                    elif self.state.status == GAME_COMPLETE:
+                        scenes.fade(lambda: self._show_summary("Congratulations! You completed the game!", GREEN))
+                else:
+                    play_sound(INCORRECT_SOUND_PATH)
+                    if self.state.status == GAME_OVER:
+                        self._show_summary("Game Over!", RED)
+                break
+
+    def _draw_match(self, country, capital):
+        flag_rect = self.flag_rects[country]
+        capital_rect = self.capital_rects[capital]
+        self.matched_lines.append((flag_rect.center, capital_rect.center))
+        area = self.lines_area
+        draw_gradient_line(
+            self.lines_layer,
+            (flag_rect.centerx - area.x, flag_rect.centery - area.y),
+            (capital_rect.centerx - area.x, capital_rect.centery - area.y),
+            (0, 255, 0), (0, 128, 0), 4
+        )
 
-            # Draw health bar and stage summary
-            draw_health_bar(lives)
-            draw_text(f"Stage: {stage_index + 1} | Correct Matches: {correct_matches} / {total_matches}", FONT, WHITE, screen, SCREEN_WIDTH // 2, 40)
-            draw_text(f"Score: {total_score}", FONT, WHITE, screen, 50, 40, center=False)
+    def update(self):
+        state = self.state
+        if state is None or self.summary:
+            return  # The summary is static, so only its first frame is drawn
+        # Only the areas touched by a click are redrawn
+        renderer.track('header', (0, 0, SCREEN_WIDTH, 120), (state.lives, state.correct_matches, state.score))
+        renderer.track('flags', self.flags_panel.inflate(20, 20), (state.selected_flag, len(state.remaining_flags)))
+        renderer.track('capitals', self.capitals_panel.inflate(20, 20), len(state.remaining_capitals))
+        for i, (start, end) in enumerate(self.matched_lines):
+            line_rect = pygame.Rect(min(start[0], end[0]), min(start[1], end[1]),
+                                    abs(end[0] - start[0]), abs(end[1] - start[1]))
+            renderer.track(('line', i), line_rect.inflate(8, 8), None)
+
+    def _draw_header(self):
+        state = self.state
+        # Draw the background
+        if self.background:
+            screen.blit(self.background, (0, 0))
+        else:
+            screen.fill(DARK_BLUE)
 
+        # Draw health bar and text
+        draw_health_bar(state.lives)
+        draw_text(f"Stage: {state.stage_index + 1} | Correct Matches: {state.correct_matches} / {len(state.flags)}", FONT, WHITE, screen, SCREEN_WIDTH // 2, 40)
+        draw_text(f"Score: {state.score}", FONT, WHITE, screen, 50, 40, center=False)
+
+    def draw(self):
+        state = self.state
+        if state is None:
+            return
+        self._draw_header()
+
+        if self.summary:
+            message, color = self.summary
             # Translucent overlay for the end-of-round summary
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            pygame.draw.rect(overlay, (0, 0, 0, 180), (SCREEN_WIDTH // 2 - 300, SCREEN_HEIGHT // 2 - 150, 600, 300), border_radius=20)
-            screen.blit(overlay, (0, 0))
+            screen.blit(surface_pool.panel((600, 300), (0, 0, 0, 180), 20), (SCREEN_WIDTH // 2 - 300, SCREEN_HEIGHT // 2 - 150))
 
             # End-of-round message
             draw_text(message, FONT_MEDIUM, color, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50)
             draw_text("Press any key to continue", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50)
+            return
 
-            pygame.display.flip()
-            pygame.time.wait(100)
-
-    running = True
-    while running:
-        # Draw the background
-        if bg_image:
-            screen.blit(bg_image, (0, 0))
-        else:
-            screen.fill(DARK_BLUE)
-
-        # Handle events
-        mouse_pos = pygame.mouse.get_pos()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                for country, rect in flag_positions:
-                    if rect.collidepoint(mouse_pos):
-                        selected_flag = country
-
-                for capital, rect in capital_positions:
-                    if rect.collidepoint(mouse_pos) and selected_flag:
-                        if capitals[selected_flag] == capital:
-                            correct_matches += 1
-                            total_score += 1
-                            if correct_sound:
-                                correct_sound.play()
-
-                            flag_rect = next(rect for f, rect in flag_positions if f == selected_flag)
-                            capital_rect = next(rect for c, rect in capital_positions if c == capital)
-                            matched_lines.append((flag_rect.center, capital_rect.center))
-
-                            flag_positions = [f for f in flag_positions if f[0] != selected_flag]
-                            capital_positions = [c for c in capital_positions if c[0] != capital]
-                            selected_flag = None
-
-                            if correct_matches == total_matches:
-                                fade_out(700)
-                                if stage_index < len(stage_data) - 1:
-                                    display_end_of_round("Round Complete!", GREEN)
-                                    return level(stage_index + 1, total_score)
-                                else:
-                                    display_end_of_round("Congratulations! You completed the game!", GREEN)
-                                    return total_score
-                        else:
-                            if incorrect_sound:
-                                incorrect_sound.play()
-                            lives -= 1
-                            selected_flag = None
-                            if lives == 0:
-                                display_end_of_round("Game Over!", RED)
-                                return total_score
-
-        # Draw health bar and text
-        draw_health_bar(lives)
-        draw_text(f"Stage: {stage_index + 1} | Correct Matches: {correct_matches} / {total_matches}", FONT, WHITE, screen, SCREEN_WIDTH // 2, 40)
-        draw_text(f"Score: {total_score}", FONT, WHITE, screen, 50, 40, center=False)
         draw_text("Click a flag, then click its correct capital.", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, 100)
 
         # Draw panels and elements
-        draw_panel(screen, pygame.Rect(80, 130, 150, (len(flags) * 80) + 40))
-        draw_panel(screen, pygame.Rect(580, 130, 250, (len(shuffled_capitals) * 80) + 40))
+        draw_panel(screen, self.flags_panel)
+        draw_panel(screen, self.capitals_panel)
 
-        for country, rect in flag_positions:
-            screen.blit(flag_images[country], rect.topleft)
-            if selected_flag == country:
+        for country in state.remaining_flags:
+            rect = self.flag_rects[country]
+            screen.blit(load_flag_image(country), rect.topleft)
+            if state.selected_flag == country:
                 glow_rect = rect.inflate(10, 10)
-                glow_surface = pygame.Surface(glow_rect.size, pygame.SRCALPHA)
-                for alpha, size in zip([50, 100, 150, 200], [40, 30, 20, 10]):
-                    glow_layer = rect.inflate(size, size)
-                    offset_x = (glow_layer.width - rect.width) // 2
-                    offset_y = (glow_layer.height - rect.height) // 2
-                    pygame.draw.ellipse(
-                        glow_surface,
-                        (255, 255, 0, alpha),
-                        glow_surface.get_rect().move(-offset_x, -offset_y)
-                    )
-                screen.blit(glow_surface, glow_rect.topleft)
-
-        for capital, rect in capital_positions:
-            text_surf = FONT.render(capital, True, WHITE)
-            capital_bg = pygame.Surface((text_surf.get_width() + 20, text_surf.get_height() + 10), pygame.SRCALPHA)
-            capital_bg.fill((0, 0, 0, 100))
+                screen.blit(surface_pool.get(('flag_glow', rect.size), lambda: _build_flag_glow(rect)), glow_rect.topleft)
+
+        for capital in state.remaining_capitals:
+            rect = self.capital_rects[capital]
+            text_surf = render_text(FONT, capital, WHITE)
+            capital_bg = surface_pool.panel((text_surf.get_width() + 20, text_surf.get_height() + 10), (0, 0, 0, 100))
             screen.blit(capital_bg, (rect.x - 10, rect.y - 5))
             screen.blit(text_surf, rect.topleft)
 
-        for line in matched_lines:
-            draw_gradient_line(screen, line[0], line[1], (0, 255, 0), (0, 128, 0), 4)
+        screen.blit(self.lines_layer, self.lines_area.topleft)
 
-        pygame.display.flip()
+
+def _build_flag_glow(rect):
+    glow_rect = rect.inflate(10, 10)
+    glow_surface = pygame.Surface(glow_rect.size, pygame.SRCALPHA)
+    for alpha, size in zip([50, 100, 150, 200], [40, 30, 20, 10]):
+        glow_layer = rect.inflate(size, size)
+        offset_x = (glow_layer.width - rect.width) // 2
+        offset_y = (glow_layer.height - rect.height) // 2
+        pygame.draw.ellipse(
+            glow_surface,
+            (255, 255, 0, alpha),
+            glow_surface.get_rect().move(-offset_x, -offset_y)
+        )
+    return glow_surface
 
 
 def draw_health_bar(lives, max_lives=2):
@@ -822,280 +2102,611 @@ def draw_health_bar(lives, max_lives=2):
 
 
 
-def monument_question_level(total_score=0):
-    # Load the custom background image
-    bg_image_path = os.path.join('assets', 'monument_background.webp')
-    try:
-        bg_image = pygame.image.load(bg_image_path)
-        bg_image = pygame.transform.scale(bg_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
-    except pygame.error as e:
-        print(f"Error loading background image: {e}")
-        bg_image = None
-
-    change_background_music(MONUMENTS_MUSIC_PATH)
-    fade_in(700)
-
-    # Extract monuments data
-    current_stage = stage_data[-1]  # Assuming monuments are the last stage
-    monuments = current_stage.get('monuments', {})
-    countries = list(monuments.keys())
-    all_monuments = list(monuments.values())
-
-    rounds = 5  # Number of questions
-    score = 0  # Track correct answers in this level
-
-    for round_number in range(1, rounds + 1):
-        # Select a random country and its correct monument
-        country = random.choice(countries)
-        correct_monument = monuments[country]
-
-        # Generate options (1 correct + 3 incorrect)
-        incorrect_monuments = random.sample(
-            [mon for mon in all_monuments if mon != correct_monument], 3
-        )
-        options = incorrect_monuments + [correct_monument]
-        random.shuffle(options)
-
-        # Display question
-        running = True
-        selected_option = None
-        message = None
-
-        while running:
-            # Draw the background
-            if bg_image:
-                screen.blit(bg_image, (0, 0))
-            else:
-                screen.fill(DARK_BLUE)
-
-            # Display round and score
-            draw_panel(screen, pygame.Rect(10, 10, SCREEN_WIDTH - 20, 60), (0, 0, 0, 120))
-            draw_text(f"Round {round_number} / {rounds}", FONT, WHITE, screen, 50, 30, center=False)
-            draw_text(f"Score: {score}", FONT, WHITE, screen, SCREEN_WIDTH - 150, 30, center=False)
-
-            # Display the question
-            # Background for the question text
-            question_text = f"Which monument is in {country}?"
-            text_surf = FONT_MEDIUM.render(question_text, True, YELLOW)
-            text_width, text_height = text_surf.get_size()
-
-            # Calculate position and background dimensions
-            bg_x = (SCREEN_WIDTH - text_width - 40) // 2  # Add padding of 20px on each side
-            bg_y = 120  # Slightly above the text
-            bg_width = text_width + 40  # Add padding
-            bg_height = text_height + 20  # Add padding
-
-            # Draw the background rectangle (gray color)
-            # Create a transparent surface
-            overlay = pygame.Surface((bg_width, bg_height), pygame.SRCALPHA)
-
-            # Fill the surface with a semi-transparent gray color
-            overlay.fill((0, 0, 0, 150)) 
-
-            # Blit the transparent surface onto the screen
-            screen.blit(overlay, (bg_x, bg_y))
-
-            # Draw the text on top of the transparent background
-            draw_text(question_text, FONT_MEDIUM, YELLOW, screen, SCREEN_WIDTH // 2, bg_y + bg_height // 2)
-
-            # Draw the text on top of the background
-            draw_text(question_text, FONT_MEDIUM, YELLOW, screen, SCREEN_WIDTH // 2, bg_y + bg_height // 2)
-
-            # Calculate button layout for 2 rows and 2 columns (centered)
-            option_positions = []
-            total_button_width = 2 * 300 + 50  # 300px button width, 50px gap between columns
-            total_button_height = 2 * 60 + 40  # 60px button height, 40px gap between rows
-            start_x = (SCREEN_WIDTH - total_button_width) // 2
-            start_y = (SCREEN_HEIGHT - total_button_height) // 2 + 70  # Center vertically with offset
-
-            button_width = 300
-            button_height = 60
-            gap_x = 50  # Horizontal gap between buttons
-            gap_y = 40  # Vertical gap between buttons
-
-            for i, option in enumerate(options):
-                row = i // 2  # Calculate row index (0 or 1)
-                col = i % 2   # Calculate column index (0 or 1)
-                x = start_x + col * (button_width + gap_x)
-                y = start_y + row * (button_height + gap_y)
-                rect = pygame.Rect(x, y, button_width, button_height)
-                option_positions.append((option, rect))
-
-                # Detect hover and draw rounded buttons
-                color_start = (255, 255, 100) if rect.collidepoint(pygame.mouse.get_pos()) else (135, 206, 250)
-                color_end = (255, 215, 0) if rect.collidepoint(pygame.mouse.get_pos()) else (30, 144, 255)
-                pygame.draw.rect(screen, color_start, rect, border_radius=20)
-                pygame.draw.rect(screen, color_end, rect.inflate(-4, -4), border_radius=20)  # Inner gradient effect
-
-                draw_text(option, FONT, WHITE, screen, rect.centerx, rect.centery)
-
-            # Display feedback message
-            if message:
-                draw_text(message, FONT, RED if "Incorrect" in message else GREEN, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100)
-
-            pygame.display.flip()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = event.pos
-                    for i, (option, rect) in enumerate(option_positions):
-                        if rect.collidepoint(mouse_pos):
-                            selected_option = option
-                            if selected_option == correct_monument:
-                                score += 1
-                                total_score += 1  # Increment total score
-                                message = "Correct!"
-                                highlight_box(screen, rect, GREEN)
-                                if correct_sound:
-                                    correct_sound.play()
-                            else:
-                                message = f"Incorrect! The correct answer was: {correct_monument}"
-                                highlight_box(screen, rect, RED)
-                                if incorrect_sound:
-                                    incorrect_sound.play()
-                            pygame.time.wait(1500)
-                            running = False
-
-    # Modern end-of-level screen
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                running = False  # Exit when key or mouse is pressed
+class AnswerButton(Widget):
+    """One monument option, turning gold while hovered."""
+
+    def __init__(self, rect, on_click=None):
+        super().__init__(rect, on_click)
+        self.text = ""
+
+    def state(self):
+        return self.hovered, self.highlight, self.text
+
+    def draw(self, surface):
+        # Rounded button with an inner gradient effect
+        color_start = (255, 255, 100) if self.hovered else (135, 206, 250)
+        color_end = (255, 215, 0) if self.hovered else (30, 144, 255)
+        pygame.draw.rect(surface, color_start, self.rect, border_radius=20)
+        pygame.draw.rect(surface, color_end, self.rect.inflate(-4, -4), border_radius=20)
+
+        draw_text(self.text, FONT, WHITE, surface, self.rect.centerx, self.rect.centery)
+        if self.highlight:
+            highlight_box(surface, self.rect, self.highlight)
+
+
+class MonumentQuizScene(Scene):
+    """Pick the monument found in the named country out of four."""
+
+    def enter(self):
+        # Load the custom background image
+        self.background = load_background(MONUMENT_BACKGROUND_PATH)
+        prefetch_next('monuments')
+
+        change_background_music(MONUMENTS_MUSIC_PATH)
+
+        # Rounds, scoring and option selection live in the headless engine
+        self.quiz = monument_quiz()
+        self.state = self.quiz.start()
+        self.buttons = [AnswerButton(rect, functools.partial(self._answer, i))
+                        for i, rect in enumerate(self._layout(len(self.state.options)))]
+        self.widgets = WidgetLayer(self.buttons)
+        self.widgets.hover(display.mouse_pos())
+        self._start_round()
+
+    def exit(self):
+        if self.round_over:
+            self.round_over.cancel()
+        self.background = self.buttons = self.widgets = None
+        prefetcher.discard('image', MONUMENT_BACKGROUND_PATH)
+
+    @staticmethod
+    def _layout(count):
+        # Calculate button layout for 2 rows and 2 columns (centered)
+        rects = []
+        total_button_width = 2 * 300 + 50  # 300px button width, 50px gap between columns
+        total_button_height = 2 * 60 + 40  # 60px button height, 40px gap between rows
+        start_x = (SCREEN_WIDTH - total_button_width) // 2
+        start_y = (SCREEN_HEIGHT - total_button_height) // 2 + 70  # Center vertically with offset
+
+        button_width = 300
+        button_height = 60
+        gap_x = 50  # Horizontal gap between buttons
+        gap_y = 40  # Vertical gap between buttons
+
+        for i in range(count):
+            row = i // 2  # Calculate row index (0 or 1)
+            col = i % 2   # Calculate column index (0 or 1)
+            x = start_x + col * (button_width + gap_x)
+            y = start_y + row * (button_height + gap_y)
+            rects.append(pygame.Rect(x, y, button_width, button_height))
+        return rects
+
+    def _start_round(self):
+        self.round_state = self.state
+        for button, option in zip(self.buttons, self.round_state.options):
+            button.text = option
+            button.highlight = None
+        self.message = None
+        self.round_over = None  # Timer that ends the round
+        self.shown_at = time.perf_counter()
+
+        # Each question starts from a clean frame; afterwards only hovered buttons change
+        renderer.begin_scene()
+
+    def _end_round(self):
+        if not self.state.finished:
+            self._start_round()
+            return
+        # Victory or Game Over message, over this mode's own background
+        results_log.session('monuments', self.state.score, self.state.rounds)
+        scenes.replace(EndScreen(self.state.score, self.state.rounds, self.background, "Level Score",
+                                 self.state.is_victory))
+
+    def _answer(self, i):
+        if self.round_over is not None:
+            return  # Already answered; the feedback is showing
+        self.state = self.quiz.step(self.round_state, Answer(self.round_state.options[i]))
+        record_answer('monuments', self.round_state.prompt, self.state.last_correct, self.shown_at)
+        if self.state.last_correct:
+            self.message = "Correct!"
+            self.buttons[i].highlight = GREEN
+            play_sound(CORRECT_SOUND_PATH)
+        else:
+            self.message = f"Incorrect! The correct answer was: {self.round_state.answer}"
+            self.buttons[i].highlight = RED
+            play_sound(INCORRECT_SOUND_PATH)
+        self.round_over = timers.after(FEEDBACK_MS, self._end_round)
+
+    def handle(self, event):
+        self.widgets.handle(event)
+
+    def update(self):
+        self.widgets.update()
+        renderer.track('message', (0, SCREEN_HEIGHT - 130, SCREEN_WIDTH, 60), self.message)
+
+    def draw(self):
+        round_state = self.round_state
 
-        # Draw end-of-level background
-        if bg_image:
-            screen.blit(bg_image, (0, 0))
+        # Draw the background
+        if self.background:
+            screen.blit(self.background, (0, 0))
         else:
             screen.fill(DARK_BLUE)
 
-        # Translucent overlay
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        pygame.draw.rect(overlay, (0, 0, 0, 180), (SCREEN_WIDTH // 2 - 300, SCREEN_HEIGHT // 2 - 150, 600, 300), border_radius=20)
-        screen.blit(overlay, (0, 0))
+        # Display round and score
+        draw_panel(screen, pygame.Rect(10, 10, SCREEN_WIDTH - 20, 60), (0, 0, 0, 120))
+        draw_text(f"Round {round_state.round_number} / {round_state.rounds}", FONT, WHITE, screen, 50, 30, center=False)
+        draw_text(f"Score: {round_state.score}", FONT, WHITE, screen, SCREEN_WIDTH - 150, 30, center=False)
+
+        # Display the question
+        # Background for the question text
+        question_text = f"Which monument is in {round_state.prompt}?"
+        text_surf = render_text(FONT_MEDIUM, question_text, YELLOW)
+        text_width, text_height = text_surf.get_size()
+
+        # Calculate position and background dimensions
+        bg_x = (SCREEN_WIDTH - text_width - 40) // 2  # Add padding of 20px on each side
+        bg_y = 120  # Slightly above the text
+        bg_width = text_width + 40  # Add padding
+        bg_height = text_height + 20  # Add padding
+
+        # Draw the semi-transparent background rectangle
+        screen.blit(surface_pool.panel((bg_width, bg_height), (0, 0, 0, 150)), (bg_x, bg_y))
+
+        # Draw the text on top of the transparent background
+        draw_text(question_text, FONT_MEDIUM, YELLOW, screen, SCREEN_WIDTH // 2, bg_y + bg_height // 2)
+
+        # Detect hover and draw rounded buttons
+        self.widgets.draw(screen)
+
+        # Display feedback message
+        if self.message:
+            draw_text(self.message, FONT, RED if "Incorrect" in self.message else GREEN, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100)
+
+
+MAP_AREA = pygame.Rect(0, 88, SCREEN_WIDTH, SCREEN_HEIGHT - 88)
+MAP_HOVER_COLOR = (255, 230, 120)
+MAP_PAN_KEYS = {
+    pygame.K_LEFT: (60, 0), pygame.K_RIGHT: (-60, 0),
+    pygame.K_UP: (0, 60), pygame.K_DOWN: (0, -60),
+}
+_world_map = None
+
+
+def get_world_map():
+    # Reading and ranking the outlines takes a few tens of ms, so only the map mode pays for it
+    global _world_map
+    if _world_map is None:
+        from world_map import WorldMap
+
+        _world_map = WorldMap()
+    return _world_map
+
+
+class MapScene(Scene):
+    """Shared pan and zoom handling for the modes played on the world map."""
+
+    def enter(self):
+        from world_map import MapView
+
+        change_background_music(CAPITALS_MUSIC_PATH)
+        prefetch_next('map')
+        self.view = MapView(get_world_map(), MAP_AREA)
+        self.dragging = False
+        self.round_over = None  # Timer that ends the round
+
+    def exit(self):
+        if self.round_over:
+            self.round_over.cancel()
+        # Tiles come back from assets/map_tiles/ quickly, so they are not kept between visits
+        self.view.map.clear_tiles()
+        self.view = None
+
+    def handle(self, event):
+        view = self.view
+        if event.type == pygame.MOUSEWHEEL:
+            view.zoom_at(display.mouse_pos(), event.y)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+            self.dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
+            self.dragging = False
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            view.pan(*event.rel)
+        elif event.type == pygame.KEYDOWN and event.key in MAP_PAN_KEYS:
+            view.pan(*MAP_PAN_KEYS[event.key])
+        elif (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.round_over is None
+              and MAP_AREA.collidepoint(event.pos)):
+            self.answer(event.pos)
+            self.round_over = timers.after(FEEDBACK_MS, self._end_round)
+
+    def _end_round(self):
+        if not self.state.finished:
+            self.start_round()
+            return
+        self.finish()
+
+    def draw_header(self, prompt):
+        screen.fill(DARK_NAVY, (0, 0, SCREEN_WIDTH, MAP_AREA.y))
+        draw_text(f"Round {self.round_state.round_number} / {self.round_state.rounds}", FONT_SMALL, WHITE, screen, 20, 12, center=False)
+        draw_text(f"Score: {self.round_state.score}", FONT_SMALL, WHITE, screen, SCREEN_WIDTH - 160, 12, center=False)
+        draw_text(prompt, FONT, YELLOW, screen, SCREEN_WIDTH // 2, 30)
+        draw_text("Scroll to zoom, right-drag or arrow keys to pan", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, 68)
+
+
+class MapQuizScene(MapScene):
+    """Find the named country on the world map."""
+
+    def enter(self):
+        super().enter()
+        world = self.view.map
+        # Natural Earth spells a few countries differently, so answers go through the quiz names
+        self.quiz_names = {}
+        for c in get_bank().select_countries():
+            shape = world.find(c.name)
+            if shape is not None:
+                self.quiz_names[shape] = c.name
+        self.quiz = map_quiz(list(self.quiz_names.values()))
+        self.state = self.quiz.start()
+        self.hovered = None
+        self.start_round()
+
+    def start_round(self):
+        self.round_state = self.state
+        self.feedback = None  # (clicked shape, correct shape, message) once the round is answered
+        self.round_over = None
+        self.shown_at = time.perf_counter()
+        renderer.begin_scene()
+
+    def answer(self, pos):
+        world = self.view.map
+        clicked = self.view.country_at(pos)
+        clicked_name = None if clicked is None else self.quiz_names.get(clicked, world.names[clicked])
+        self.state = self.quiz.step(self.round_state, Answer(clicked_name))
+        record_answer('map', self.round_state.prompt, self.state.last_correct, self.shown_at)
+        if self.state.last_correct:
+            self.feedback = (clicked, clicked, "Correct!")
+            play_sound(CORRECT_SOUND_PATH)
+        else:
+            self.feedback = (clicked, world.find(self.round_state.prompt), f"Incorrect! That was {clicked_name or 'the sea'}")
+            play_sound(INCORRECT_SOUND_PATH)
+
+    def finish(self):
+        results_log.session('map', self.state.score, self.state.rounds)
+        scenes.replace(EndScreen(self.state.score, self.state.rounds))
+
+    def update(self):
+        view = self.view
+        self.hovered = view.country_at(display.mouse_pos())
+        renderer.track('header', (0, 0, SCREEN_WIDTH, MAP_AREA.y), None)
+        renderer.track('map', MAP_AREA, (view.state, self.feedback))
+        renderer.track('hover', view.country_rect(self.hovered), (view.state, self.hovered))
+
+    def draw(self):
+        view = self.view
+        self.draw_header(f"Click on {self.round_state.prompt}")
+        view.draw(screen)
+        if self.feedback:
+            clicked, correct, message = self.feedback
+            if clicked is not None and clicked != correct:
+                view.draw_country(screen, clicked, RED)
+            view.draw_country(screen, correct, GREEN)
+            draw_text(message, FONT, GREEN if clicked == correct else RED, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 40)
+        elif self.hovered is not None:
+            view.draw_country(screen, self.hovered, MAP_HOVER_COLOR)
+
+
+LOCATION_MARKER_RADIUS = 6
+
+
+class CapitalFinderScene(MapScene):
+    """Click where the named capital is; points fall off with the distance."""
+
+    def enter(self):
+        super().enter()
+        self.quiz = capital_location_quiz()
+        self.state = self.quiz.start()
+        self.start_round()
+
+    def start_round(self):
+        self.round_state = self.state
+        self.feedback = None  # (click, target, message) in lat/lon once the round is answered
+        self.round_over = None
+        self.shown_at = time.perf_counter()
+        renderer.begin_scene()
+
+    def answer(self, pos):
+        lon, lat = self.view.to_lonlat(pos)
+        state = self.state = self.quiz.step(self.round_state, ClickLocation(lat, lon))
+        # Counted as correct when no other capital is closer to the click
+        record_answer('location', self.round_state.country, state.last_nearest == self.round_state.prompt,
+                      self.shown_at)
+        message = f"{state.last_distance_km:,.0f} km away: +{state.last_points} points"
+        if state.last_nearest != self.round_state.prompt:
+            message += f" (closest capital: {state.last_nearest})"
+        self.feedback = (state.last_click, state.last_target, message)
+        play_sound(CORRECT_SOUND_PATH if state.last_points >= LOCATION_MAX_POINTS // 2 else INCORRECT_SOUND_PATH)
+
+    def finish(self):
+        results_log.session('location', self.state.score, self.state.rounds * LOCATION_MAX_POINTS)
+        scenes.replace(EndScreen(self.state.score, self.state.rounds * LOCATION_MAX_POINTS))
+
+    def update(self):
+        renderer.track('header', (0, 0, SCREEN_WIDTH, MAP_AREA.y), None)
+        renderer.track('map', MAP_AREA, (self.view.state, self.feedback))
+
+    def draw(self):
+        view = self.view
+        self.draw_header(f"Where is {self.round_state.prompt} ({self.round_state.country})?")
+        view.draw(screen)
+        if self.feedback:
+            click, target, message = self.feedback
+            previous_clip = screen.get_clip()
+            screen.set_clip(MAP_AREA.clip(previous_clip))
+            click_pos = view.to_screen(click[1], click[0])
+            target_pos = view.to_screen(target[1], target[0])
+            pygame.draw.line(screen, WHITE, click_pos, target_pos, 2)
+            pygame.draw.circle(screen, RED, click_pos, LOCATION_MARKER_RADIUS)
+            pygame.draw.circle(screen, GREEN, target_pos, LOCATION_MARKER_RADIUS)
+            screen.set_clip(previous_clip)
+            screen.blit(surface_pool.panel((720, 40), (0, 0, 0, 160), 10), (SCREEN_WIDTH // 2 - 360, SCREEN_HEIGHT - 50))
+            draw_text(message, FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT - 30)
+
+
+GRADIENT_CACHE_SIZE = 32  # Gradient surfaces kept before evicting
+_gradients = OrderedDict()
+
+
+def gradient_surface(size, color1, color2, vertical=True):
+    # Gradients are built once with NumPy and then reused for every draw
+    key = (tuple(size), tuple(color1[:3]), tuple(color2[:3]), vertical)
+    surface = _gradients.get(key)
+    if surface is not None:
+        _gradients.move_to_end(key)
+        return surface
+
+    import numpy as np
+
+    frame_metrics.count('surface_allocs')
+    width, height = key[0]
+    steps = height if vertical else width
+    ratio = (np.arange(steps) / steps)[:, None]
+    ramp = (np.array(key[1]) * (1 - ratio) + np.array(key[2]) * ratio).astype(np.uint8)
+
+    # surfarray pixels are indexed [x, y]
+    pixels = np.empty((width, height, 3), dtype=np.uint8)
+    pixels[:] = ramp[None, :, :] if vertical else ramp[:, None, :]
+    surface = pygame.surfarray.make_surface(pixels)
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert()
+
+    _gradients[key] = surface
+    if len(_gradients) > GRADIENT_CACHE_SIZE:
+        _gradients.popitem(last=False)
+    return surface
 
-        # Victory or Game Over message
-        is_victory = score >= 3  # At least 3 correct answers to win
-        message = "Victory! Well Done!" if is_victory else "Game Over! Better Luck Next Time!"
-        text_color = GREEN if is_victory else RED
 
-        # Play corresponding sound
-        if is_victory and victory_sound:
-            victory_sound.play()
-        elif not is_victory and lose_sound:
-            lose_sound.play()
+# Function to draw gradient box
+def draw_gradient_box(surface, rect, color1, color2, border_radius=0):
+    surface.blit(gradient_surface(rect.size, color1, color2), rect.topleft)
 
-        # Draw result messages
-        draw_text(message, FONT_MEDIUM, text_color, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 70)
-        draw_text(f"Level Score: {score}/{rounds}", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20)
-        draw_text("Press any key to continue", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100)
+# Function to highlight selected box
+def highlight_box(surface, rect, color):
+    surface.blit(surface_pool.panel(rect.size, (*color, 150), 10), rect.topleft)
 
-        pygame.display.update()
 
-    pygame.time.wait(500)
+STATS_WEAKEST = 3  # Countries listed on the stats screen
 
-    return total_score
 
+class StatsScene(Scene):
+    """Accuracy, response times and scores per mode from the results log; any key or click goes back."""
 
+    COLUMNS = [("Mode", 90), ("Answers", 300), ("Correct", 420), ("Avg time", 540), ("Sessions", 660), ("Best", 780)]
 
+    def enter(self):
+        self.loaded = False
+        self._load()
 
-# Function to draw gradient box
-def draw_gradient_box(surface, rect, color1, color2, border_radius=0):
-    gradient_surface = pygame.Surface((rect.width, rect.height))
-    for y in range(rect.height):
-        ratio = y / rect.height
-        r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
-        g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
-        b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
-        pygame.draw.line(gradient_surface, (r, g, b), (0, y), (rect.width, y))
-    gradient_surface = pygame.transform.smoothscale(gradient_surface, (rect.width, rect.height))
-    surface.blit(gradient_surface, rect.topleft)
+    def _load(self):
+        # The log's worker thread loads the totals; until then the screen says so
+        stats = results_log.stats()
+        if stats is None:
+            return
+        self.loaded = True
+        self.rows = [
+            (mode.title(), str(answers), "-" if accuracy is None else f"{accuracy:.0%}",
+             "-" if seconds is None else f"{seconds:.1f}s", str(sessions), str(best))
+            for mode, answers, accuracy, seconds, sessions, _, best in stats.summary()
+        ]
+        self.weakest = ", ".join(f"{country} {share:.0%}" for _, country, share, _ in stats.weakest(STATS_WEAKEST))
+        renderer.begin_scene()
 
-# Function to highlight selected box
-def highlight_box(surface, rect, color):
-    highlight_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-    pygame.draw.rect(highlight_surface, (*color, 150), highlight_surface.get_rect(), border_radius=10)
-    surface.blit(highlight_surface, rect.topleft)
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
+            scenes.pop(fade=TRANSITION_MS)
 
+    def update(self):
+        if not self.loaded and results_log.enabled:
+            self._load()
 
-def main_menu():
-    # Load the background image
-    image_path= os.path.join('assets', 'mainMenu_background.webp')
-    background_image = pygame.image.load(image_path)
-    background_image = pygame.transform.scale(background_image, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    def draw(self):
+        draw_gradient_background(screen, LIGHT_BLUE, DARK_BLUE)
+        draw_text_with_shadow("Your Stats", FONT_MEDIUM, WHITE, screen, SCREEN_WIDTH // 2, 60)
+        draw_panel(screen, pygame.Rect(60, 110, 780, 380), (0, 0, 0, 150))
+        for text, x in self.COLUMNS:
+            draw_text(text, FONT_SMALL, YELLOW, screen, x, 125, center=False)
+        if not self.loaded:
+            message = "Loading..." if results_log.enabled else "Results logging is off (--no-results)"
+            draw_text(message, FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, 280)
+        elif not self.rows:
+            draw_text("No answers logged yet", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, 280)
+        else:
+            for i, row in enumerate(self.rows):
+                for text, (_, x) in zip(row, self.COLUMNS):
+                    draw_text(text, FONT_SMALL, WHITE, screen, x, 175 + i * 40, center=False)
+        if self.loaded and self.weakest:
+            draw_text(f"Weakest: {self.weakest}", FONT_SMALL, WHITE, screen, SCREEN_WIDTH // 2, 460)
+        draw_text("Charts: python results_log.py --charts stats", FONT_SMALL, LIGHT_BLUE, screen, SCREEN_WIDTH // 2, 530)
+        draw_text("Press any key to continue", FONT_SMALL, LIGHT_BLUE, screen, SCREEN_WIDTH // 2, 570)
+
+
+class MainMenu(Scene):
+    """Title screen; each button pushes a mode on top of it."""
+
+    MODES = [
+        ('Country Capitals', CapitalsScene, TRANSITION_MS),
+        ('Flag Guessing', FlagQuizScene, 0),
+        ('Monument Quiz', MonumentQuizScene, TRANSITION_MS),
+        ('Map Quiz', MapQuizScene, 0),
+        ('Capital Finder', CapitalFinderScene, 0),
+    ]
 
-    change_background_music(MENU_MUSIC_PATH)
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+    def __init__(self):
+        x = SCREEN_WIDTH // 2 - 100
+        self.widgets = WidgetLayer(
+            Button(text, (x, 250 + i * 70, 250, 50), functools.partial(self._start, mode, fade),
+                   sound=CLICK_SOUND_PATH)
+            for i, (text, mode, fade) in enumerate(self.MODES)
+        )
+        self.widgets.add(Button("Stats", (SCREEN_WIDTH - 140, 20, 120, 44),
+                                functools.partial(self._start, StatsScene, TRANSITION_MS), sound=CLICK_SOUND_PATH))
 
+    def _start(self, mode, fade):
+        scenes.push(mode(), fade)
+
+    def enter(self):
+        # Load the background image
+        self.background = load_background(MENU_BACKGROUND_PATH)
+        self.resume(None)
+
+    def resume(self, result):
+        prefetch_next('menu')
+        change_background_music(MENU_MUSIC_PATH)
+        # The pointer moved on while a mode was running
+        self.widgets.hover(display.mouse_pos())
+
+    def exit(self):
+        self.background = None
+        prefetcher.discard('image', MENU_BACKGROUND_PATH)
+
+    def handle(self, event):
+        self.widgets.handle(event)
+
+    def update(self):
+        self.widgets.update()
+
+    def draw(self):
         # Draw the background image
-        screen.blit(background_image, (0, 0))
+        if self.background:
+            screen.blit(self.background, (0, 0))
+        else:
+            screen.fill(DARK_BLUE)
 
         # Draw the game title with shadow
         draw_text_with_shadow('GeoMaster', FONT_LARGE, WHITE, screen, SCREEN_WIDTH // 2, 100, shadow_offset=6)
 
         # Draw buttons
-        draw_button(screen, 'Country Capitals', SCREEN_WIDTH // 2 - 100, 250, 250, 50, EMERALD_GREEN, HOVER_EMERALD_GREEN, lambda: level(0))
-        draw_button(screen, 'Flag Guessing', SCREEN_WIDTH // 2 - 100, 320, 250, 50, EMERALD_GREEN, HOVER_EMERALD_GREEN, flag_guessing_game)
-        draw_button(screen, 'Monument Quiz', SCREEN_WIDTH // 2 - 100, 390, 250, 50,EMERALD_GREEN, HOVER_EMERALD_GREEN, monument_question_level)
+        self.widgets.draw(screen)
+
+
+class SequentialGame(Scene):
+    """Plays the capitals, flag and monument modes back to back and adds up the scores."""
+
+    LEVELS = [
+        ("Country Capitals", CapitalsScene),
+        ("Flag Guessing", FlagQuizScene),
+        ("Monument Quiz", MonumentQuizScene),
+    ]
+
+    def enter(self):
+        self.total_score = 0
+        self.max_score = 0
+        self.index = 0
+        self.final = False
+        # Display level start message
+        self._card(f"Starting {self.LEVELS[0][0]}", 2000, self._play)
+
+    def exit(self):
+        self.timer.cancel()
+
+    def _card(self, text, duration, then):
+        self.text = text
+        self.timer = timers.after(duration, then)
+        renderer.begin_scene()
+
+    def _play(self):
+        scenes.push(self.LEVELS[self.index][1]())
+
+    def resume(self, result):
+        # Show interim score
+        level_name = self.LEVELS[self.index][0]
+        level_score, level_max_score = result or (0, 0)
+        self.total_score += level_score
+        self.max_score += level_max_score
+        self._card(f"{level_name} Complete! Score: {level_score}/{level_max_score}", 3000, self._next)
+
+    def _next(self):
+        self.index += 1
+        if self.index < len(self.LEVELS):
+            self._card(f"Starting {self.LEVELS[self.index][0]}", 2000, self._play)
+            return
+        # Final score display
+        self.final = True
+        results_log.session('sequential', self.total_score, self.max_score)
+        self._card("", 5000, lambda: scenes.pop((self.total_score, self.max_score)))
+
+    def draw(self):
+        if not self.final:
+            draw_background()
+            draw_text_with_shadow(self.text, FONT, WHITE, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+            return
+
+        total_score, max_score = self.total_score, self.max_score
+        draw_gradient_background(screen, LIGHT_BLUE, DARK_BLUE)
+        box_rect = pygame.Rect(SCREEN_WIDTH // 2 - 250, SCREEN_HEIGHT // 2 - 150, 500, 300)
+        pygame.draw.rect(screen, YELLOW if total_score > max_score // 2 else RED, box_rect, border_radius=15)
+        pygame.draw.rect(screen, BLACK, box_rect, 5, border_radius=15)
 
-        pygame.display.update()
+        message = "Victory!" if total_score > max_score // 2 else "Game Over!"
+        draw_text(message, FONT, BLACK, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 40)
+        draw_text(f"Total Score: {total_score}/{max_score}", FONT_SMALL, BLACK, screen, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 40)
 
 
 # Function to draw gradient background
 def draw_gradient_background(surface, color1, color2):
-    for y in range(SCREEN_HEIGHT):
-        ratio = y / SCREEN_HEIGHT
-        r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
-        g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
-        b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
-        pygame.draw.line(surface, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+    surface.blit(gradient_surface((SCREEN_WIDTH, SCREEN_HEIGHT), color1, color2), (0, 0))
 
 # Function to draw text with shadow
 def draw_text_with_shadow(text, font, color, surface, x, y, shadow_color=BLACK, shadow_offset=3):
     # Draw shadow
-    shadow_text = font.render(text, True, shadow_color)
+    shadow_text = render_text(font, text, shadow_color)
     shadow_rect = shadow_text.get_rect(center=(x + shadow_offset, y + shadow_offset))
     surface.blit(shadow_text, shadow_rect)
 
     # Draw main text
-    main_text = font.render(text, True, color)
+    main_text = render_text(font, text, color)
     main_rect = main_text.get_rect(center=(x, y))
     surface.blit(main_text, main_rect)
 
-# Updated button function with hover effect
-def draw_button(surface, text, x, y, w, h, inactive_color, active_color, action=None):
-    mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
-    rect = pygame.Rect(x, y, w, h)
-    hover = rect.collidepoint(mouse)
-
-    color = active_color if hover else inactive_color
-
-    # Draw button with rounded corners
-    pygame.draw.rect(surface, color, rect, border_radius=12)
-
-    # Draw button text
-    draw_text(text, FONT, WHITE, surface, x + w // 2, y + h // 2)
-
-    # Play action if clicked
-    if hover and click[0] == 1 and action:
-        if click_sound:
-            click_sound.play()
-        action()
-
-
-# Run the game
-
-main_menu()          
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description="GeoMaster geography quiz")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="report time spent per startup phase and exit after the first menu frame")
+    parser.add_argument('--fps', type=int, default=FPS_CAP,
+                        help=f"frame rate cap for the game loops (default {FPS_CAP})")
+    parser.add_argument('--metrics', nargs='?', const=METRICS_PATH, metavar='PATH',
+                        help=f"count per-frame work, show it with F3 and write it as JSON lines (default {METRICS_PATH})")
+    parser.add_argument('--fullscreen', action='store_true', help="start in fullscreen; F11 toggles it")
+    parser.add_argument('--results', default=RESULTS_LOG_PATH, metavar='PATH',
+                        help=f"append every answer and final score to PATH (default {RESULTS_LOG_PATH})")
+    parser.add_argument('--no-results', action='store_true', help="don't log answers or scores")
+    args = parser.parse_args()
+
+    frame_scheduler.fps = args.fps
+    if args.metrics:
+        frame_metrics.enable(args.metrics)
+    if not args.no_results:
+        results_log.open(args.results)
+        atexit.register(results_log.close)
+
+    if args.profile_startup:
+        startup_profiler.enable(_IMPORT_TIME)
+    init_game()
+    if args.fullscreen:
+        display.toggle_fullscreen()
+    scenes.run(MainMenu())
+
+
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+"""Headless rules for GeoMaster's quiz modes.
+
+Nothing here imports pygame. Each mode is a small state machine: start()
+returns the first state and step(state, action) returns the next one, so the
+same rules drive the pygame scenes in main.py and fast seeded simulations:
+
+    python quiz_engine.py --sessions 10000 --seed 1 --clicks 100000
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass, replace
+
+from game_data import get_bank, sample_excluding
+
+# NumPy and geo are only loaded by the location scoring below, so the
+# text quizzes (and main.py's startup) don't pay for importing them.
+
+CAPITALS_LIVES = 2
+FLAG_ROUNDS = 5
+FLAG_OPTIONS = 3
+MONUMENT_ROUNDS = 5
+MONUMENT_OPTIONS = 4
+MONUMENT_WIN_SCORE = 3  # At least 3 correct answers to win
+MAP_ROUNDS = 5
+MAP_WIN_SCORE = 3
+LOCATION_ROUNDS = 5
+LOCATION_MAX_POINTS = 1000  # Per round
+LOCATION_FULL_MARKS_KM = 50  # Clicks at most this far from the capital score full points
+LOCATION_SCALE_KM = 1500  # Beyond that, points fall off by a factor e every 1500 km
+LOCATION_CLICK_SPREAD_DEG = 4.0  # Spread of simulated clicks around a country's centroid
+
+# Capitals match status
+PLAYING = 'playing'
+STAGE_COMPLETE = 'stage_complete'
+GAME_COMPLETE = 'game_complete'
+GAME_OVER = 'game_over'
+
+
+# Actions
+@dataclass(frozen=True)
+class SelectFlag:
+    country: str
+
+
+@dataclass(frozen=True)
+class ChooseCapital:
+    capital: str
+
+
+@dataclass(frozen=True)
+class NextStage:
+    pass
+
+
+@dataclass(frozen=True)
+class Answer:
+    option: str
+
+
+@dataclass(frozen=True)
+class ClickLocation:
+    lat: float
+    lon: float
+
+
+# States
+@dataclass(frozen=True)
+class CapitalsState:
+    stage_index: int
+    flags: tuple  # Flags of the stage in display order
+    capitals: tuple  # Capitals of the stage in shuffled display order
+    remaining_flags: tuple
+    remaining_capitals: tuple
+    lives: int = CAPITALS_LIVES
+    score: int = 0  # Total score across stages
+    correct_matches: int = 0
+    selected_flag: str = None
+    matches: tuple = ()  # (country, capital) pairs in the order they were matched
+    status: str = PLAYING
+    last_correct: bool = None  # Outcome of the latest capital choice
+
+
+@dataclass(frozen=True)
+class QuizState:
+    round_number: int
+    rounds: int
+    score: int
+    prompt: str  # Country the question is about
+    options: tuple
+    answer: str
+    win_score: int
+    last_choice: str = None
+    last_correct: bool = None
+    finished: bool = False
+
+    @property
+    def is_victory(self):
+        return self.score >= self.win_score
+
+
+@dataclass(frozen=True)
+class LocationState:
+    round_number: int
+    rounds: int
+    score: int
+    prompt: str  # Capital to find
+    country: str
+    target: tuple  # (lat, lon) of the capital
+    win_score: int
+    distances: tuple = ()  # km from the capital of every answered round
+    last_click: tuple = None  # (lat, lon)
+    last_target: tuple = None  # (lat, lon) of the capital the last click was scored against
+    last_distance_km: float = None
+    last_points: int = None
+    last_nearest: str = None  # Capital closest to the last click
+    finished: bool = False
+
+    @property
+    def is_victory(self):
+        return self.score >= self.win_score
+
+
+class CapitalsGame:
+    """Match each flag of a stage with its capital before running out of lives."""
+
+    def __init__(self, stages=None, rng=None):
+        stages = get_bank().capital_stages() if stages is None else stages
+        self.stages = [stage for stage in stages if 'flags' in stage]
+        self.rng = rng or random.Random()
+
+    def start(self, stage_index=0, score=0):
+        stage = self.stages[stage_index]
+        flags = tuple(stage['flags'])
+        capitals = [stage['capitals'][country] for country in flags]
+        self.rng.shuffle(capitals)
+        return CapitalsState(stage_index, flags, tuple(capitals), flags, tuple(capitals), score=score)
+
+    def step(self, state, action):
+        if isinstance(action, NextStage):
+            if state.status == STAGE_COMPLETE:
+                return self.start(state.stage_index + 1, state.score)
+            return state
+        if state.status != PLAYING:
+            return state
+
+        if isinstance(action, SelectFlag):
+            if action.country not in state.remaining_flags:
+                return state
+            return replace(state, selected_flag=action.country)
+
+        if isinstance(action, ChooseCapital):
+            if state.selected_flag is None or action.capital not in state.remaining_capitals:
+                return state
+            return self._choose_capital(state, action.capital)
+
+        raise TypeError(f"Unknown action for the capitals game: {action!r}")
+
+    def _choose_capital(self, state, capital):
+        country = state.selected_flag
+        if self.stages[state.stage_index]['capitals'][country] != capital:
+            lives = state.lives - 1
+            return replace(state, lives=lives, selected_flag=None, last_correct=False,
+                           status=GAME_OVER if lives == 0 else PLAYING)
+
+        correct_matches = state.correct_matches + 1
+        status = PLAYING
+        if correct_matches == len(state.flags):
+            last_stage = state.stage_index == len(self.stages) - 1
+            status = GAME_COMPLETE if last_stage else STAGE_COMPLETE
+        return replace(
+            state,
+            remaining_flags=tuple(c for c in state.remaining_flags if c != country),
+            remaining_capitals=tuple(c for c in state.remaining_capitals if c != capital),
+            score=state.score + 1,
+            correct_matches=correct_matches,
+            selected_flag=None,
+            matches=state.matches + ((country, capital),),
+            status=status,
+            last_correct=True,
+        )
+
+
+class MultipleChoiceQuiz:
+    """Rounds of one question with a fixed number of options, one of them correct.
+
+    pairs are (prompt, answer) tuples. A prompt may have several answers, none
+    of which is ever offered as a distractor for it.
+    """
+
+    def __init__(self, pairs, rounds, options, win_score, rng=None):
+        self.pairs = list(pairs)
+        self.answers = {}
+        for prompt, answer in self.pairs:
+            self.answers.setdefault(prompt, set()).add(answer)
+        self.choices = list(dict.fromkeys(answer for _, answer in self.pairs))
+        self.rounds = rounds
+        self.options = options
+        self.win_score = win_score
+        self.rng = rng or random.Random()
+
+    def start(self):
+        return self._round(1, 0)
+
+    def _round(self, round_number, score, **last):
+        prompt, answer = self.rng.choice(self.pairs)
+        options = sample_excluding(self.choices, self.options - 1, self.answers[prompt], self.rng) + [answer]
+        self.rng.shuffle(options)
+        return QuizState(round_number, self.rounds, score, prompt, tuple(options), answer,
+                         self.win_score, **last)
+
+    def step(self, state, action):
+        if not isinstance(action, Answer):
+            raise TypeError(f"Unknown action for a quiz: {action!r}")
+        if state.finished or not self._accepts(state, action.option):
+            return state
+
+        correct = action.option == state.answer
+        score = state.score + (1 if correct else 0)
+        if state.round_number == state.rounds:
+            return replace(state, score=score, last_choice=action.option, last_correct=correct, finished=True)
+        return self._round(state.round_number + 1, score, last_choice=action.option, last_correct=correct)
+
+    def _accepts(self, state, option):
+        return option in state.options
+
+
+class MapQuiz(MultipleChoiceQuiz):
+    """Rounds of "find this country on the map", answered with any country."""
+
+    def __init__(self, countries, rounds=MAP_ROUNDS, win_score=MAP_WIN_SCORE, rng=None):
+        super().__init__([(c, c) for c in countries], rounds, 0, win_score, rng)
+
+    def _round(self, round_number, score, **last):
+        prompt, answer = self.rng.choice(self.pairs)
+        return QuizState(round_number, self.rounds, score, prompt, (), answer, self.win_score, **last)
+
+    def _accepts(self, state, option):
+        return True
+
+
+def location_points(distance_km):
+    """Points for clicks this many km from the target; works on arrays too."""
+    import numpy as np
+
+    excess = np.maximum(np.asarray(distance_km, dtype=float) - LOCATION_FULL_MARKS_KM, 0)
+    return np.rint(LOCATION_MAX_POINTS * np.exp(-excess / LOCATION_SCALE_KM)).astype(int)
+
+
+def score_clicks(target_lats, target_lons, click_lats, click_lons):
+    """Score a batch of clicks at once; returns (distances in km, points)."""
+    from geo import haversine_km
+
+    distances = haversine_km(target_lats, target_lons, click_lats, click_lons)
+    return distances, location_points(distances)
+
+
+class CapitalLocationQuiz:
+    """Rounds of "click where this capital is", scored by great-circle distance.
+
+    countries are game_data.Country rows. The closest capital to every click is
+    looked up among cities (every country of the bank by default), so a miss
+    can tell the player which capital they actually found.
+    """
+
+    def __init__(self, countries, rounds=LOCATION_ROUNDS, rng=None, cities=None):
+        from geo import NearestCityIndex
+
+        self.countries = list(countries)
+        self.cities = list(get_bank().countries if cities is None else cities)
+        self.city_index = NearestCityIndex([c.lat for c in self.cities], [c.lon for c in self.cities])
+        self.rounds = rounds
+        self.win_score = rounds * LOCATION_MAX_POINTS // 2 + 1
+        self.rng = rng or random.Random()
+
+    def start(self):
+        return self._round(1, 0, ())
+
+    def _round(self, round_number, score, distances, **last):
+        country = self.rng.choice(self.countries)
+        return LocationState(round_number, self.rounds, score, country.capital, country.name,
+                             (country.lat, country.lon), self.win_score, distances, **last)
+
+    def step(self, state, action):
+        if not isinstance(action, ClickLocation):
+            raise TypeError(f"Unknown action for the capital location quiz: {action!r}")
+        if state.finished:
+            return state
+
+        from geo import haversine_km
+
+        # Rejects clicks that aren't finite numbers before anything is scored
+        nearest, _ = self.city_index.nearest(action.lat, action.lon)
+        distance = float(haversine_km(state.target[0], state.target[1], action.lat, action.lon))
+        points = int(location_points(distance))
+        last = {
+            'last_click': (action.lat, action.lon),
+            'last_target': state.target,
+            'last_distance_km': distance,
+            'last_points': points,
+            'last_nearest': self.cities[nearest].capital,
+        }
+        score = state.score + points
+        distances = state.distances + (distance,)
+        if state.round_number == state.rounds:
+            return replace(state, score=score, distances=distances, finished=True, **last)
+        return self._round(state.round_number + 1, score, distances, **last)
+
+
+def flag_quiz(rng=None, countries=None, region=None, difficulty=None):
+    # Only countries with flag art can be asked about
+    if countries is None:
+        countries = [c.name for c in get_bank().select_countries(region, difficulty, flag=True)]
+    return MultipleChoiceQuiz([(c, c) for c in countries], FLAG_ROUNDS, FLAG_OPTIONS,
+                              FLAG_ROUNDS // 2 + 1, rng)
+
+
+def monument_quiz(rng=None, monuments=None, region=None, difficulty=None):
+    # monuments are (country, monument) pairs
+    if monuments is None:
+        monuments = [(m.country, m.name) for m in get_bank().select_monuments(region, difficulty)]
+    return MultipleChoiceQuiz(monuments, MONUMENT_ROUNDS, MONUMENT_OPTIONS, MONUMENT_WIN_SCORE, rng)
+
+
+def map_quiz(countries, rng=None, region=None, difficulty=None):
+    # countries are the names the map can show; the bank narrows them by region and difficulty
+    if region is not None or difficulty is not None:
+        selected = {c.name for c in get_bank().select_countries(region, difficulty)}
+        countries = [c for c in countries if c in selected]
+    return MapQuiz(countries, rng=rng)
+
+
+def capital_location_quiz(rng=None, region=None, difficulty=None):
+    return CapitalLocationQuiz(get_bank().select_countries(region, difficulty), rng=rng)
+
+
+def simulate_session(rng):
+    """Play every mode once with random choices and return the three scores."""
+    game = CapitalsGame(rng=rng)
+    state = game.start()
+    while state.status in (PLAYING, STAGE_COMPLETE):
+        if state.status == STAGE_COMPLETE:
+            state = game.step(state, NextStage())
+            continue
+        state = game.step(state, SelectFlag(rng.choice(state.remaining_flags)))
+        state = game.step(state, ChooseCapital(rng.choice(state.remaining_capitals)))
+    scores = [state.score]
+
+    for quiz in (flag_quiz(rng), monument_quiz(rng)):
+        state = quiz.start()
+        while not state.finished:
+            state = quiz.step(state, Answer(rng.choice(state.options)))
+        scores.append(state.score)
+    return scores
+
+
+def simulate(sessions, seed=0):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    results = [simulate_session(rng) for _ in range(sessions)]
+    return results, time.perf_counter() - start
+
+
+def simulate_clicks(clicks, seed=0, spread=LOCATION_CLICK_SPREAD_DEG):
+    """Batch-score clicks of players who know the country but not its capital.
+
+    Each click lands around the centroid of the asked country's outline with
+    Gaussian noise of spread degrees. Returns the distance summary, the mean
+    points, how often the closest capital to the click was the right one, and
+    the time spent scoring (not loading the outlines).
+    """
+    import numpy as np
+    from geo import NearestCityIndex, distance_summary
+    from world_shapes import country_centroids
+
+    countries = get_bank().countries
+    centroids = country_centroids([c.name for c in countries])
+    asked = [i for i, c in enumerate(countries) if c.name in centroids]
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(asked), size=clicks)
+    asked_index = np.array(asked)[picks]
+    target_lats = np.array([c.lat for c in countries])[asked_index]
+    target_lons = np.array([c.lon for c in countries])[asked_index]
+    centre_lons, centre_lats = np.array([centroids[countries[i].name] for i in asked]).T
+    click_lats = np.clip(centre_lats[picks] + rng.normal(0, spread, clicks), -90, 90)
+    click_lons = (centre_lons[picks] + rng.normal(0, spread, clicks) + 180) % 360 - 180
+
+    start = time.perf_counter()
+    distances, points = score_clicks(target_lats, target_lons, click_lats, click_lons)
+    index = NearestCityIndex([c.lat for c in countries], [c.lon for c in countries])
+    nearest, _ = index.nearest_many(click_lats, click_lons)
+    elapsed = time.perf_counter() - start
+
+    summary = distance_summary(distances)
+    summary['mean_points'] = float(points.mean())
+    summary['nearest_is_target'] = float((nearest == asked_index).mean())
+    return summary, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded GeoMaster sessions without a window")
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clicks', type=int, default=100000,
+                        help="simulated clicks to batch-score for the capital location quiz (0 to skip)")
+    args = parser.parse_args()
+
+    results, elapsed = simulate(args.sessions, args.seed)
+    print(f"{args.sessions} sessions in {elapsed:.2f}s ({args.sessions / elapsed:,.0f} sessions/s)")
+    for i, mode in enumerate(['Country Capitals', 'Flag Guessing', 'Monument Quiz']):
+        scores = [r[i] for r in results]
+        print(f"  {mode:<17} mean score {sum(scores) / len(scores):.2f}, best {max(scores)}")
+
+    if args.clicks:
+        summary, elapsed = simulate_clicks(args.clicks, args.seed)
+        print(f"{args.clicks} capital location clicks scored in {elapsed * 1000:.1f} ms "
+              f"({args.clicks / elapsed:,.0f} clicks/s)")
+        print(f"  mean {summary['mean_km']:.0f} km, median {summary['median_km']:.0f} km, "
+              f"p90 {summary['p90_km']:.0f} km, mean points {summary['mean_points']:.0f}, "
+              f"closest capital was the asked one {summary['nearest_is_target']:.0%}")
+
+
+if __name__ == '__main__':
+    main()
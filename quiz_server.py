@@ -0,0 +1,413 @@
+"""Host many headless GeoMaster quiz sessions over a local socket.
+
+The server speaks newline-delimited JSON over TCP or a Unix socket. Every
+request is one object with an "op"; every reply is one line, in request
+order, so clients may pipeline as many requests as they like:
+
+    {"op": "new", "mode": "flags"}               -> {"s": 1, "state": {...}}
+    {"op": "answer", "s": 1, "option": "Peru"}   -> {"s": 1, "state": {...}}
+    {"op": "select", "s": 2, "country": "Peru"}  (capitals)
+    {"op": "choose", "s": 2, "capital": "Lima"}  (capitals)
+    {"op": "next", "s": 2}                       (capitals, after a stage)
+    {"op": "click", "s": 3, "lat": 4.6, "lon": -74.1}  (location)
+    {"op": "close", "s": 1}                      -> {"s": 1, "closed": true}
+
+Sessions belong to their connection and end with it, or as soon as a reply
+reports "finished". Bad requests get {"error": "..."} and leave the
+connection open. The rules are quiz_engine's, so a session plays exactly
+like the game. The load generator plays random sessions against a running
+server and reports sessions/s and answer latency percentiles:
+
+    python quiz_server.py serve --unix /tmp/geomaster.sock
+    python quiz_server.py load --unix /tmp/geomaster.sock --sessions 20000 --concurrency 2000
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from quiz_engine import (
+    GAME_COMPLETE, GAME_OVER, STAGE_COMPLETE, Answer, CapitalsGame, CapitalsState, ChooseCapital,
+    ClickLocation, LocationState, NextStage, SelectFlag, capital_location_quiz, flag_quiz, monument_quiz,
+)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_SESSIONS_PER_CONNECTION = 10000
+MAX_LINE_BYTES = 4096
+MODES = ('capitals', 'flags', 'monuments', 'location')
+OPS = ('new', 'answer', 'select', 'choose', 'next', 'click', 'close')
+
+
+def _quiz_state(state):
+    # The answer stays on the server until the round is over
+    message = {
+        'round': state.round_number,
+        'rounds': state.rounds,
+        'score': state.score,
+        'prompt': state.prompt,
+        'options': state.options,
+        'last_correct': state.last_correct,
+        'finished': state.finished,
+    }
+    if state.finished:
+        message['victory'] = state.is_victory
+    return message
+
+
+def _capitals_state(state):
+    return {
+        'stage': state.stage_index,
+        'flags': state.remaining_flags,
+        'capitals': state.remaining_capitals,
+        'lives': state.lives,
+        'score': state.score,
+        'selected': state.selected_flag,
+        'status': state.status,
+        'last_correct': state.last_correct,
+        'finished': state.status in (GAME_OVER, GAME_COMPLETE),
+    }
+
+
+def _location_state(state):
+    message = {
+        'round': state.round_number,
+        'rounds': state.rounds,
+        'score': state.score,
+        'prompt': state.prompt,
+        'finished': state.finished,
+    }
+    if state.last_points is not None:
+        message.update(last_km=round(state.last_distance_km, 1), last_points=state.last_points,
+                       last_nearest=state.last_nearest)
+    if state.finished:
+        message['victory'] = state.is_victory
+    return message
+
+
+def encode_state(state):
+    if isinstance(state, CapitalsState):
+        return _capitals_state(state)
+    if isinstance(state, LocationState):
+        return _location_state(state)
+    return _quiz_state(state)
+
+
+def _action(request):
+    # The engines check the action against the session's state
+    op = request['op']
+    if op == 'answer':
+        return Answer(str(request['option']))
+    if op == 'select':
+        return SelectFlag(str(request['country']))
+    if op == 'choose':
+        return ChooseCapital(str(request['capital']))
+    if op == 'next':
+        return NextStage()
+    return ClickLocation(_coordinate(request, 'lat', 90), _coordinate(request, 'lon', 180))
+
+
+def _coordinate(request, field, limit):
+    # NaN, infinities and huge integers would poison the session's score
+    try:
+        value = float(request[field])
+    except OverflowError:
+        value = math.inf
+    if not (math.isfinite(value) and -limit <= value <= limit):
+        raise ValueError(f"{field} must be a number from {-limit} to {limit}")
+    return value
+
+
+class QuizConnection(asyncio.Protocol):
+    """One client's sessions; every chunk of requests is answered with one write.
+
+    Reading pauses while the client is slow to take its replies, so a client
+    that stops reading can't grow the server's buffers without bound.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.sessions = {}  # Session id -> (engine, state)
+        self.last_id = 0
+        self.transport = None
+        self._buffer = b''
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections += 1
+
+    def connection_lost(self, exc):
+        self.server.connections -= 1
+        self.server.sessions -= len(self.sessions)
+        self.sessions.clear()
+
+    def data_received(self, data):
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        replies = [self.server.reply(self, line) for line in lines if line.strip()]
+        too_long = len(self._buffer) > MAX_LINE_BYTES
+        if too_long:
+            replies.append(b'{"error":"request too long"}\n')
+        if replies:
+            self.transport.write(b''.join(replies))
+        if too_long:
+            self.transport.close()
+
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+
+class QuizServer:
+    """Runs every connection's sessions against one shared set of engines.
+
+    The engines are built once at startup; a session is just its engine and
+    latest immutable state, so thousands of them cost little more than
+    their states. Requests are handled synchronously as they arrive, since
+    a step takes microseconds, and pipelined requests are answered together
+    in a single write.
+    """
+
+    def __init__(self, rng=None):
+        rng = rng or random.Random()
+        self.engines = {
+            'capitals': CapitalsGame(rng=rng),
+            'flags': flag_quiz(rng),
+            'monuments': monument_quiz(rng),
+            'location': capital_location_quiz(rng),
+        }
+        self.connections = 0
+        self.sessions = 0  # Currently open
+        self.started = 0
+        self.finished = 0
+        self.requests = 0
+
+    def handle_request(self, connection, request):
+        """Apply one decoded request to a connection's sessions and return the reply."""
+        self.requests += 1
+        if not isinstance(request, dict):
+            raise ValueError("a request must be a JSON object")
+        op = request.get('op')
+        if op not in OPS:
+            raise ValueError(f"unknown op {op!r}")
+        if op == 'new':
+            mode = request.get('mode')
+            if mode not in self.engines:
+                raise ValueError(f"unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+            if len(connection.sessions) >= MAX_SESSIONS_PER_CONNECTION:
+                raise ValueError("too many sessions on this connection")
+            engine = self.engines[mode]
+            connection.last_id += 1
+            session_id = connection.last_id
+            state = engine.start()
+            connection.sessions[session_id] = (engine, state)
+            self.sessions += 1
+            self.started += 1
+            return {'s': session_id, 'state': encode_state(state)}
+
+        session_id = request.get('s')
+        if session_id not in connection.sessions:
+            raise ValueError(f"no open session {session_id!r}")
+        if op == 'close':
+            del connection.sessions[session_id]
+            self.sessions -= 1
+            return {'s': session_id, 'closed': True}
+
+        engine, state = connection.sessions[session_id]
+        state = engine.step(state, _action(request))
+        message = encode_state(state)
+        if message['finished']:
+            del connection.sessions[session_id]
+            self.sessions -= 1
+            self.finished += 1
+        else:
+            connection.sessions[session_id] = (engine, state)
+        return {'s': session_id, 'state': message}
+
+    def reply(self, connection, line):
+        try:
+            reply = self.handle_request(connection, json.loads(line))
+        except KeyError as e:
+            reply = {'error': f"missing field {e}"}
+        except (ValueError, TypeError) as e:
+            reply = {'error': str(e)}
+        except Exception as e:
+            # One bad line must not take the connection's other sessions down
+            reply = {'error': f"{type(e).__name__}: {e}"}
+        return json.dumps(reply, separators=(',', ':'), allow_nan=False).encode() + b'\n'
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+        loop = asyncio.get_running_loop()
+        if unix:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            server = await loop.create_unix_server(lambda: QuizConnection(self), unix)
+            where = unix
+        else:
+            server = await loop.create_server(lambda: QuizConnection(self), host, port)
+            where = f"{host}:{port}"
+        print(f"Serving {', '.join(MODES)} quizzes on {where}")
+        async with server:
+            await server.serve_forever()
+
+    def stats(self):
+        return {
+            'connections': self.connections,
+            'sessions': self.sessions,
+            'started': self.started,
+            'finished': self.finished,
+            'requests': self.requests,
+        }
+
+
+class QuizClient:
+    """One connection whose requests may be pipelined from many coroutines.
+
+    Replies come back in request order, so each request just waits for the
+    next reply slot it queued. Requests made in the same event loop
+    iteration go out in one write.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._waiting = collections.deque()
+        self._outgoing = []
+        self._reading = asyncio.ensure_future(self._read_replies())
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix, limit=1 << 20)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def request(self, message):
+        reply = asyncio.get_running_loop().create_future()
+        self._waiting.append(reply)
+        self._outgoing.append(json.dumps(message, separators=(',', ':'), allow_nan=False).encode() + b'\n')
+        if len(self._outgoing) == 1:
+            asyncio.get_running_loop().call_soon(self._flush)
+        return await reply
+
+    def _flush(self):
+        self.writer.write(b''.join(self._outgoing))
+        self._outgoing.clear()
+
+    async def _read_replies(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                self._waiting.popleft().set_result(json.loads(line))
+        finally:
+            while self._waiting:
+                self._waiting.popleft().set_exception(ConnectionError("server closed the connection"))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self._reading.cancel()
+
+
+async def play_session(client, mode, rng, latencies):
+    """Play one session with random moves, appending each answer's latency in seconds."""
+
+    async def send(message):
+        start = time.perf_counter()
+        reply = await client.request(message)
+        latencies.append(time.perf_counter() - start)
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    reply = await send({'op': 'new', 'mode': mode})
+    session_id, state = reply['s'], reply['state']
+    while not state['finished']:
+        if mode == 'capitals':
+            if state['status'] == STAGE_COMPLETE:
+                message = {'op': 'next'}
+            elif state['selected'] is None:
+                message = {'op': 'select', 'country': rng.choice(state['flags'])}
+            else:
+                message = {'op': 'choose', 'capital': rng.choice(state['capitals'])}
+        elif mode == 'location':
+            message = {'op': 'click', 'lat': rng.uniform(-60, 70), 'lon': rng.uniform(-180, 180)}
+        else:
+            message = {'op': 'answer', 'option': rng.choice(state['options'])}
+        message['s'] = session_id
+        state = (await send(message))['state']
+    return state['score']
+
+
+async def generate_load(sessions, concurrency, connections, modes=MODES, seed=0,
+                        host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+    """Play sessions against a running server, concurrency of them at a time."""
+    clients = [await QuizClient.connect(host, port, unix) for _ in range(connections)]
+    rng = random.Random(seed)
+    latencies = []
+    remaining = iter(range(sessions))
+
+    async def worker(client):
+        for i in remaining:
+            await play_session(client, modes[i % len(modes)], rng, latencies)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker(clients[i % connections]) for i in range(concurrency)))
+    finally:
+        elapsed = time.perf_counter() - start
+        for client in clients:
+            await client.close()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve GeoMaster quizzes over a local socket, or load-test a server")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="host quiz sessions until interrupted")
+    load = commands.add_parser('load', help="play random sessions against a running server")
+    for command in (serve, load):
+        command.add_argument('--host', default=DEFAULT_HOST)
+        command.add_argument('--port', type=int, default=DEFAULT_PORT)
+        command.add_argument('--unix', metavar='PATH', help="use a Unix socket instead of TCP")
+    serve.add_argument('--seed', type=int, help="seed the quiz questions")
+    load.add_argument('--sessions', type=int, default=10000, help="sessions to play in total")
+    load.add_argument('--concurrency', type=int, default=1000, help="sessions in progress at once")
+    load.add_argument('--connections', type=int, default=20)
+    load.add_argument('--mode', action='append', choices=MODES, help="modes to play (repeatable, default all)")
+    load.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        server = QuizServer(random.Random(args.seed))
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            print(f"Stopped: {server.stats()}")
+        return 0
+
+    latencies, elapsed = asyncio.run(generate_load(
+        args.sessions, min(args.concurrency, args.sessions), args.connections, tuple(args.mode or MODES),
+        args.seed, args.host, args.port, args.unix))
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    print(f"{args.sessions} sessions in {elapsed:.2f}s ({args.sessions / elapsed:,.0f} sessions/s, "
+          f"{len(latencies) / elapsed:,.0f} requests/s)")
+    print(f"  latency p50 {p50:.2f} ms, p95 {p95:.2f} ms, p99 {p99:.2f} ms, max {latencies_ms.max():.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Append-only log of answers and session scores, with incremental stats.
+
+Every answer is one tab-separated line, and so is every finished session:
+
+    A  <unix time>  <mode>  <country>  <1|0>  <response ms>
+    S  <unix time>  <mode>  <score>  <max score>
+
+ResultsLog takes records from the game loop without blocking. A worker
+thread writes them in batches and fsyncs at most once per
+RESULTS_FSYNC_INTERVAL seconds. ResultsStats keeps running totals in
+<log>.stats.json together with the byte offset they cover, so loading
+them only reads the lines appended since. Charts are drawn from the
+totals with pygal, which is only imported when charts are asked for:
+
+    python results_log.py --charts stats/
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+RESULTS_LOG_PATH = 'results.log'
+RESULTS_FSYNC_INTERVAL = 1.0  # Seconds an answer may sit in OS buffers before it is synced
+RESULTS_BATCH = 256  # Records written at once, at most
+WEAKEST_MIN_ANSWERS = 2  # Countries answered fewer times are left out of the weakest list
+CHART_DAYS = 30
+
+
+def stats_path(log_path):
+    # Totals belong to exactly one log, so they are named after it
+    return f'{log_path}.stats.json'
+
+
+class ResultsStats:
+    """Running totals over the results log and the log offset they cover.
+
+    modes maps a mode to its answers, correct answers, summed response
+    time, sessions, summed scores, summed max scores and best score;
+    countries maps mode -> country -> [answers, correct] and days maps
+    YYYY-MM-DD -> [answers, correct].
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.modes = {}
+        self.countries = {}
+        self.days = {}
+
+    def _mode(self, mode):
+        totals = self.modes.get(mode)
+        if totals is None:
+            totals = self.modes[mode] = {'answers': 0, 'correct': 0, 'ms': 0.0, 'sessions': 0,
+                                         'score': 0, 'max_score': 0, 'best': 0}
+        return totals
+
+    def add_answer(self, when, mode, country, correct, response_ms):
+        totals = self._mode(mode)
+        totals['answers'] += 1
+        totals['correct'] += correct
+        totals['ms'] += response_ms
+        country_totals = self.countries.setdefault(mode, {}).setdefault(country, [0, 0])
+        country_totals[0] += 1
+        country_totals[1] += correct
+        day = self.days.setdefault(time.strftime('%Y-%m-%d', time.localtime(when)), [0, 0])
+        day[0] += 1
+        day[1] += correct
+
+    def add_session(self, when, mode, score, max_score):
+        totals = self._mode(mode)
+        totals['sessions'] += 1
+        totals['score'] += score
+        totals['max_score'] += max_score
+        totals['best'] = max(totals['best'], score)
+
+    def add_line(self, line):
+        fields = line.rstrip('\n').split('\t')
+        try:
+            if fields[0] == 'A' and len(fields) == 6:
+                self.add_answer(float(fields[1]), fields[2], fields[3], int(fields[4]), float(fields[5]))
+            elif fields[0] == 'S' and len(fields) == 5:
+                self.add_session(float(fields[1]), fields[2], int(fields[3]), int(fields[4]))
+        except ValueError:
+            pass  # A line torn by a crash; the rest of the log is still good
+
+    def read_log(self, path):
+        """Add the lines appended to the log since the last read."""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Still being written; picked up next time
+                self.offset += len(line)
+                self.add_line(line.decode('utf-8', 'replace'))
+
+    @classmethod
+    def load(cls, log_path=RESULTS_LOG_PATH):
+        stats = cls()
+        try:
+            with open(stats_path(log_path)) as f:
+                saved = json.load(f)
+            stats.offset, stats.modes, stats.countries, stats.days = (
+                saved['offset'], saved['modes'], saved['countries'], saved['days'])
+        except (OSError, ValueError, KeyError):
+            stats = cls()
+        # A log shorter than the saved offset was replaced, so its totals start over
+        if stats.offset > (os.path.getsize(log_path) if os.path.exists(log_path) else 0):
+            stats = cls()
+        stats.read_log(log_path)
+        return stats
+
+    def save(self, log_path=RESULTS_LOG_PATH):
+        path = stats_path(log_path)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'offset': self.offset, 'modes': self.modes, 'countries': self.countries,
+                       'days': self.days}, f, separators=(',', ':'))
+        os.replace(temporary, path)
+
+    def copy(self):
+        other = ResultsStats()
+        other.offset = self.offset
+        other.modes = {mode: dict(totals) for mode, totals in self.modes.items()}
+        other.countries = {mode: {country: list(totals) for country, totals in countries.items()}
+                           for mode, countries in self.countries.items()}
+        other.days = {day: list(totals) for day, totals in self.days.items()}
+        return other
+
+    def summary(self):
+        """Yield (mode, answers, accuracy, mean response s, sessions, mean score share, best)."""
+        for mode, totals in sorted(self.modes.items()):
+            answers = totals['answers']
+            yield (mode, answers,
+                   totals['correct'] / answers if answers else None,
+                   totals['ms'] / answers / 1000 if answers else None,
+                   totals['sessions'],
+                   totals['score'] / totals['max_score'] if totals['max_score'] else None,
+                   totals['best'])
+
+    def weakest(self, count=10, min_answers=WEAKEST_MIN_ANSWERS):
+        """The (mode, country, accuracy, answers) answered worst, least accurate first."""
+        rows = [(mode, country, correct / answers, answers)
+                for mode, countries in self.countries.items()
+                for country, (answers, correct) in countries.items() if answers >= min_answers]
+        return sorted(rows, key=lambda row: (row[2], -row[3]))[:count]
+
+
+class ResultsLog:
+    """Appends answers and session scores to the results log from a worker thread.
+
+    Nothing is written until open(). answer() and session() only queue a
+    line, so the game loop never waits for the disk. The worker loads the
+    saved totals when it starts, adds every batch it writes to them and
+    saves them on close(); stats() hands out a copy.
+    """
+
+    def __init__(self, path=RESULTS_LOG_PATH):
+        self.path = path
+        self.enabled = False
+        self._stats = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def open(self, path=None):
+        if path:
+            self.path = path
+        self.enabled = True
+        self._thread = threading.Thread(target=self._run, name='results-log', daemon=True)
+        self._thread.start()
+
+    def answer(self, mode, country, correct, response_ms):
+        if self.enabled:
+            self._queue.put(f'A\t{time.time():.3f}\t{mode}\t{_field(country)}\t{int(correct)}\t{response_ms:.0f}\n')
+
+    def session(self, mode, score, max_score):
+        if self.enabled:
+            self._queue.put(f'S\t{time.time():.3f}\t{mode}\t{score}\t{max_score}\n')
+
+    def stats(self):
+        """A copy of the running totals, or None while they load or when the log is off."""
+        with self._lock:
+            return None if self._stats is None else self._stats.copy()
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        # A line torn by a crash must not run into the first new one
+        with open(self.path, 'ab') as f:
+            if f.tell() and not _ends_with_newline(self.path):
+                f.write(b'\n')
+        # Only the lines logged since the totals were last saved are read
+        stats = ResultsStats.load(self.path)
+        with self._lock:
+            self._stats = stats
+        synced_at = time.monotonic()
+        unsynced = False
+        with open(self.path, 'ab') as f:
+            while True:
+                timeout = max(0.0, synced_at + RESULTS_FSYNC_INTERVAL - time.monotonic()) if unsynced else None
+                try:
+                    batch = [self._queue.get(timeout=timeout)]
+                except queue.Empty:
+                    batch = []
+                while batch and batch[-1] is not None and len(batch) < RESULTS_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                done = batch and batch[-1] is None
+                lines = batch[:-1] if done else batch
+                if lines:
+                    data = ''.join(lines).encode('utf-8')
+                    f.write(data)
+                    f.flush()
+                    unsynced = True
+                    with self._lock:
+                        for line in lines:
+                            stats.add_line(line)
+                        stats.offset += len(data)
+                if unsynced and (done or time.monotonic() - synced_at >= RESULTS_FSYNC_INTERVAL):
+                    os.fsync(f.fileno())
+                    synced_at = time.monotonic()
+                    unsynced = False
+                if done:
+                    break
+        with self._lock:
+            stats.save(self.path)
+
+
+def _field(text):
+    # Tabs and newlines would split the record
+    return str(text).replace('\t', ' ').replace('\n', ' ')
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def render_charts(stats, directory, days=CHART_DAYS):
+    """Write accuracy, daily activity and weakest-country charts as SVG; returns their paths."""
+    import pygal  # Only needed for charts
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+
+    accuracy = pygal.Bar(title="Accuracy by mode", range=(0, 100), value_formatter=lambda v: f"{v:.0f}%")
+    for mode, answers, share, *_ in stats.summary():
+        if answers:
+            accuracy.add(mode, [share * 100])
+    paths.append(os.path.join(directory, 'accuracy.svg'))
+    accuracy.render_to_file(paths[-1])
+
+    recent = sorted(stats.days.items())[-days:]
+    daily = pygal.Line(title=f"Answers per day (last {len(recent)} days)", x_label_rotation=45)
+    daily.x_labels = [day for day, _ in recent]
+    daily.add("Answers", [answers for _, (answers, _) in recent])
+    daily.add("Correct", [correct for _, (_, correct) in recent])
+    paths.append(os.path.join(directory, 'daily.svg'))
+    daily.render_to_file(paths[-1])
+
+    weakest = pygal.HorizontalBar(title="Weakest countries", range=(0, 100),
+                                  value_formatter=lambda v: f"{v:.0f}%")
+    for mode, country, share, answers in reversed(stats.weakest()):
+        weakest.add(f"{country} ({mode}, {answers})", [share * 100])
+    paths.append(os.path.join(directory, 'weakest.svg'))
+    weakest.render_to_file(paths[-1])
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise the GeoMaster results log")
+    parser.add_argument('--log', default=RESULTS_LOG_PATH)
+    parser.add_argument('--charts', metavar='DIR', help="also write pygal SVG charts into DIR")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = ResultsStats.load(args.log)
+    stats.save(args.log)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'mode':<12} {'answers':>8} {'correct':>8} {'avg time':>9} {'sessions':>9} {'avg score':>10} {'best':>6}")
+    for mode, answers, accuracy, seconds, sessions, score_share, best in stats.summary():
+        print(f"{mode:<12} {answers:>8} {_percent(accuracy):>8} "
+              f"{'-' if seconds is None else f'{seconds:.1f}s':>9} {sessions:>9} {_percent(score_share):>10} {best:>6}")
+    weakest = stats.weakest(5)
+    if weakest:
+        print("Weakest: " + ", ".join(f"{country} ({mode}) {_percent(share)}" for mode, country, share, _ in weakest))
+    print(f"Totals cover {stats.offset:,} bytes of {args.log}, updated in {elapsed * 1000:.1f} ms")
+
+    if args.charts:
+        try:
+            paths = render_charts(stats, args.charts)
+        except ImportError:
+            print("Charts need pygal: pip install pygal")
+            return 1
+        print(f"Charts written: {', '.join(paths)}")
+    return 0
+
+
+def _percent(share):
+    return '-' if share is None else f"{share:.0%}"
+
+
+if __name__ == '__main__':
+    sys.exit(main())
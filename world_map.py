@@ -0,0 +1,300 @@
+"""Tiled, level-of-detail world map drawn from the Natural Earth outlines.
+
+Every outline is projected once with NumPy (equirectangular, normalised to
+0..1) and ranked once by Douglas-Peucker, so each zoom level takes only
+the points it can show with a single mask per ring. The map itself is drawn
+into 256 px tiles that are rasterised on first use and then kept in memory
+and under assets/map_tiles/. Panning and zooming only blit cached tiles;
+the hovered or answered country is drawn on top as an overlay.
+"""
+import hashlib
+import math
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from world_shapes import NAME_ALIASES, NAME_FIELDS, SHAPEFILE_ZIP, ShapeIndex, read_shapes
+
+MAP_TILE_SIZE = 256
+MAP_MIN_ZOOM = 2  # 1024 x 512 px, the whole world on one screen
+MAP_MAX_ZOOM = 5
+MAP_SIMPLIFY_PX = 0.5  # Douglas-Peucker tolerance in screen pixels
+SIMPLIFY_NUMPY_MIN = 64  # Spans longer than this are measured with NumPy
+MAP_TILE_CACHE_SIZE = 96  # Tiles kept in memory
+MAP_TILE_DIR = os.path.join('assets', 'map_tiles')
+MAP_STYLE_VERSION = 1  # Bump when the tile look changes so cached tiles are rebuilt
+
+OCEAN_COLOR = (22, 62, 110)
+BORDER_COLOR = (40, 40, 40)
+# Natural Earth's MAPCOLOR7 gives neighbouring countries different indexes
+LAND_COLORS = [
+    (214, 196, 148), (178, 204, 150), (222, 170, 140), (196, 182, 212),
+    (150, 198, 196), (226, 210, 120), (190, 160, 130),
+]
+
+MAP_FIELDS = {*NAME_FIELDS, 'MAPCOLOR7'}
+
+
+def dp_importance(points):
+    """Douglas-Peucker tolerance at which each point of a polyline drops out.
+
+    Running the recursion to the end once and clamping every split to its
+    parent's distance gives, for any tolerance t, exactly the points that
+    Douglas-Peucker keeps at t: points[dp_importance(points) > t]. Short
+    spans are measured in plain Python, where NumPy's call overhead dominates.
+    """
+    count = len(points)
+    importance = np.zeros(count)
+    importance[0] = importance[-1] = np.inf
+    xs, ys = points[:, 0].tolist(), points[:, 1].tolist()
+    stack = [(0, count - 1, math.inf)]
+    while stack:
+        start, end, parent = stack.pop()
+        if end - start < 2:
+            continue
+        ax, ay = xs[start], ys[start]
+        dx, dy = xs[end] - ax, ys[end] - ay
+        length = math.hypot(dx, dy)  # Zero for a closed ring's first span
+        if end - start <= SIMPLIFY_NUMPY_MIN:
+            best, split = -1.0, start + 1
+            for k in range(start + 1, end):
+                px, py = xs[k] - ax, ys[k] - ay
+                distance = abs(dx * py - dy * px) / length if length else math.hypot(px, py)
+                if distance > best:
+                    best, split = distance, k
+        else:
+            inner = points[start + 1:end] - (ax, ay)
+            if length:
+                distances = np.abs(dx * inner[:, 1] - dy * inner[:, 0]) / length
+            else:
+                distances = np.hypot(inner[:, 0], inner[:, 1])
+            i = int(np.argmax(distances))
+            best, split = float(distances[i]), start + 1 + i
+        value = min(best, parent)
+        importance[split] = value
+        stack.append((start, split, value))
+        stack.append((split, end, value))
+    return importance
+
+
+def _project(rings):
+    # lon/lat to 0..1 on both axes, y pointing down
+    return [np.column_stack(((ring[:, 0] + 180) / 360, (90 - ring[:, 1]) / 180)) for ring in rings]
+
+
+def _signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def world_size(zoom):
+    width = MAP_TILE_SIZE << zoom
+    return width, width // 2
+
+
+class WorldMap:
+    """Projected country outlines, their simplified forms and the tile cache."""
+
+    def __init__(self, path=SHAPEFILE_ZIP):
+        shapes = list(read_shapes(path, MAP_FIELDS))
+        # Big countries first, so enclaves such as Lesotho are painted over them
+        shapes.sort(key=lambda s: (s.bbox[2] - s.bbox[0]) * (s.bbox[3] - s.bbox[1]), reverse=True)
+        self.index = ShapeIndex(shapes)
+        self.shapes = self.index.shapes
+        self.names = [shape.record['NAME'] for shape in self.shapes]
+        self._by_name = {}
+        for i, shape in enumerate(self.shapes):
+            for field in NAME_FIELDS:
+                self._by_name.setdefault(shape.record[field], i)
+
+        self._projected = [_project(shape.rings) for shape in self.shapes]
+        self._importance = [[dp_importance(ring) for ring in rings] for rings in self._projected]
+        # Shapefile outer rings run clockwise; in y-down space their area is positive
+        self.holes = [[_signed_area(ring) < 0 for ring in rings] for rings in self._projected]
+        self.bounds = [(np.min([ring.min(axis=0) for ring in rings], axis=0),
+                        np.max([ring.max(axis=0) for ring in rings], axis=0))
+                       for rings in self._projected]
+        self._lod = {}
+        self._tiles = OrderedDict()
+        self._tile_dir = os.path.join(MAP_TILE_DIR, self._signature(path))
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        style = repr((MAP_STYLE_VERSION, MAP_TILE_SIZE, MAP_SIMPLIFY_PX, OCEAN_COLOR, BORDER_COLOR, LAND_COLORS))
+        return hashlib.blake2b(f'{stat.st_size}:{stat.st_mtime_ns}:{style}'.encode(), digest_size=8).hexdigest()
+
+    def find(self, name):
+        """Index of the shape for a game country name, or None."""
+        return self._by_name.get(NAME_ALIASES.get(name, name))
+
+    def rings(self, zoom):
+        # Simplified once per zoom level, in normalised coordinates
+        lod = self._lod.get(zoom)
+        if lod is None:
+            tolerance = MAP_SIMPLIFY_PX / world_size(zoom)[0]
+            lod = self._lod[zoom] = [[ring[importance > tolerance] for ring, importance in zip(rings, importances)]
+                                     for rings, importances in zip(self._projected, self._importance)]
+        return lod
+
+    def shape_at(self, lon, lat):
+        return self.index.hit_test(lon, lat)
+
+    def tile(self, zoom, tx, ty):
+        key = (zoom, tx, ty)
+        surface = self._tiles.get(key)
+        if surface is not None:
+            self._tiles.move_to_end(key)
+            return surface
+
+        path = os.path.join(self._tile_dir, f'{zoom}_{tx}_{ty}.png')
+        surface = None
+        if os.path.exists(path):
+            try:
+                surface = pygame.image.load(path)
+            except pygame.error:
+                surface = None
+        if surface is None:
+            surface = self._rasterize(zoom, tx, ty)
+            self._save_tile(surface, path)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+
+        self._tiles[key] = surface
+        if len(self._tiles) > MAP_TILE_CACHE_SIZE:
+            self._tiles.popitem(last=False)
+        return surface
+
+    def clear_tiles(self):
+        # Drops the in-memory tiles; the disk cache stays
+        self._tiles.clear()
+
+    def _save_tile(self, surface, path):
+        try:
+            os.makedirs(self._tile_dir, exist_ok=True)
+            pygame.image.save(surface, path)
+        except (OSError, pygame.error) as e:
+            print(f"Warning: Could not cache map tile {path}: {e}")
+
+    def _rasterize(self, zoom, tx, ty):
+        surface = pygame.Surface((MAP_TILE_SIZE, MAP_TILE_SIZE))
+        surface.fill(OCEAN_COLOR)
+        width, height = world_size(zoom)
+        scale = np.array([width, height], dtype=float)
+        origin = np.array([tx * MAP_TILE_SIZE, ty * MAP_TILE_SIZE], dtype=float)
+        # Normalised bounds of this tile, to skip countries that don't touch it
+        low = origin / scale
+        high = (origin + MAP_TILE_SIZE) / scale
+
+        for i, rings in enumerate(self.rings(zoom)):
+            shape_low, shape_high = self.bounds[i]
+            if (shape_high < low).any() or (shape_low > high).any():
+                continue
+            color = LAND_COLORS[(self.shapes[i].record['MAPCOLOR7'] or 1) % len(LAND_COLORS)]
+            for ring, hole in zip(rings, self.holes[i]):
+                points = ring * scale - origin
+                if len(points) < 3:
+                    continue
+                pygame.draw.polygon(surface, OCEAN_COLOR if hole else color, points)
+                pygame.draw.aalines(surface, BORDER_COLOR, True, points)
+        return surface
+
+
+class MapView:
+    """A pannable, zoomable window onto a WorldMap inside a screen rect."""
+
+    def __init__(self, world_map, rect, zoom=MAP_MIN_ZOOM):
+        self.map = world_map
+        self.rect = pygame.Rect(rect)
+        self.zoom = zoom
+        width, height = world_size(zoom)
+        self.offset = [(width - self.rect.width) / 2, (height - self.rect.height) / 2]
+        self._clamp()
+
+    @property
+    def state(self):
+        # Changes whenever the visible tiles move
+        return self.zoom, int(self.offset[0]), int(self.offset[1])
+
+    def _clamp(self):
+        width, height = world_size(self.zoom)
+        for axis, (world, view) in enumerate(((width, self.rect.width), (height, self.rect.height))):
+            if world <= view:
+                self.offset[axis] = (world - view) / 2
+            else:
+                self.offset[axis] = min(max(self.offset[axis], 0), world - view)
+
+    def pan(self, dx, dy):
+        self.offset[0] -= dx
+        self.offset[1] -= dy
+        self._clamp()
+
+    def zoom_at(self, pos, steps):
+        zoom = min(max(self.zoom + steps, MAP_MIN_ZOOM), MAP_MAX_ZOOM)
+        if zoom == self.zoom:
+            return
+        # Keep the point under the cursor in place
+        factor = 2 ** (zoom - self.zoom)
+        local = (pos[0] - self.rect.x, pos[1] - self.rect.y)
+        self.offset = [(self.offset[0] + local[0]) * factor - local[0],
+                       (self.offset[1] + local[1]) * factor - local[1]]
+        self.zoom = zoom
+        self._clamp()
+
+    def to_lonlat(self, pos):
+        width, height = world_size(self.zoom)
+        x = (pos[0] - self.rect.x + self.offset[0]) / width
+        y = (pos[1] - self.rect.y + self.offset[1]) / height
+        return x * 360 - 180, 90 - y * 180
+
+    def to_screen(self, lon, lat):
+        width, height = world_size(self.zoom)
+        return ((lon + 180) / 360 * width - self.offset[0] + self.rect.x,
+                (90 - lat) / 180 * height - self.offset[1] + self.rect.y)
+
+    def country_at(self, pos):
+        if not self.rect.collidepoint(pos):
+            return None
+        return self.map.shape_at(*self.to_lonlat(pos))
+
+    def _screen_points(self, ring):
+        width, height = world_size(self.zoom)
+        return ring * (width, height) - (self.offset[0] - self.rect.x, self.offset[1] - self.rect.y)
+
+    def country_rect(self, index):
+        """Screen rect covering a country at the current view, clipped to the map."""
+        if index is None:
+            return pygame.Rect(0, 0, 0, 0)
+        low, high = self.map.bounds[index]
+        (x1, y1), (x2, y2) = self._screen_points(np.array([low, high]))
+        return pygame.Rect(int(x1) - 2, int(y1) - 2, int(x2 - x1) + 5, int(y2 - y1) + 5).clip(self.rect)
+
+    def draw(self, surface):
+        previous_clip = surface.get_clip()
+        surface.set_clip(self.rect.clip(previous_clip))
+        first_x = int(self.offset[0] // MAP_TILE_SIZE)
+        first_y = int(self.offset[1] // MAP_TILE_SIZE)
+        width, height = world_size(self.zoom)
+        tiles_x, tiles_y = width // MAP_TILE_SIZE, height // MAP_TILE_SIZE
+        if self.offset[1] < 0:
+            surface.fill(OCEAN_COLOR, self.rect)
+        for ty in range(max(first_y, 0), min(int((self.offset[1] + self.rect.height) // MAP_TILE_SIZE) + 1, tiles_y)):
+            for tx in range(max(first_x, 0), min(int((self.offset[0] + self.rect.width) // MAP_TILE_SIZE) + 1, tiles_x)):
+                position = (self.rect.x + tx * MAP_TILE_SIZE - int(self.offset[0]),
+                            self.rect.y + ty * MAP_TILE_SIZE - int(self.offset[1]))
+                surface.blit(self.map.tile(self.zoom, tx, ty), position)
+        surface.set_clip(previous_clip)
+
+    def draw_country(self, surface, index, color, outline=(255, 255, 255)):
+        # Overlay for one country, drawn over the cached tiles
+        previous_clip = surface.get_clip()
+        surface.set_clip(self.rect.clip(previous_clip))
+        for ring, hole in zip(self.map.rings(self.zoom)[index], self.map.holes[index]):
+            if len(ring) < 3 or hole:
+                continue
+            points = self._screen_points(ring)
+            pygame.draw.polygon(surface, color, points)
+            pygame.draw.lines(surface, outline, True, points, 2)
+        surface.set_clip(previous_clip)
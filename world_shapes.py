@@ -0,0 +1,239 @@
+"""Country outlines from the bundled Natural Earth shapefile.
+
+The .shp and .dbf members are streamed straight out of
+assets/shapefiles/ne_110m_admin_0_countries.zip record by record, so
+nothing is extracted to disk and no GIS package is needed. ShapeIndex
+buckets the outlines into a coarse lon/lat grid of bounding boxes and
+answers "which country is at this point" with an exact point-in-polygon
+test against the few candidates of one cell:
+
+    python world_shapes.py 2.35 48.86
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+
+SHAPEFILE_ZIP = os.path.join('assets', 'shapefiles', 'ne_110m_admin_0_countries.zip')
+SHAPEFILE_NAME = 'ne_110m_admin_0_countries'
+GRID_CELL_DEGREES = 10
+
+SHAPE_NULL = 0
+SHAPE_POLYGON = 5
+
+NAME_FIELDS = ('NAME', 'NAME_LONG', 'ADMIN')
+# Game names that Natural Earth spells differently
+NAME_ALIASES = {
+    'USA': 'United States of America',
+    'UK': 'United Kingdom',
+    'Czech Republic': 'Czechia',
+    'DR Congo': 'Dem. Rep. Congo',
+    'Ivory Coast': "Côte d'Ivoire",
+    'Dominican Republic': 'Dominican Rep.',
+}
+
+# record holds the requested .dbf attributes, bbox is (xmin, ymin, xmax, ymax)
+# and rings are (N, 2) arrays of lon/lat points, outer rings and holes alike.
+Shape = namedtuple('Shape', ['record', 'bbox', 'rings'])
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("shapefile ended in the middle of a record")
+    return data
+
+
+def iter_shp(stream):
+    """Yield (bbox, rings) for every record of a .shp stream."""
+    header = _read_exact(stream, 100)
+    (file_code,) = struct.unpack('>i', header[:4])
+    if file_code != 9994:
+        raise ValueError("not a shapefile")
+
+    while True:
+        record_header = stream.read(8)
+        if not record_header:
+            return
+        _, length_words = struct.unpack('>ii', record_header)
+        content = _read_exact(stream, length_words * 2)
+        (shape_type,) = struct.unpack_from('<i', content)
+        if shape_type == SHAPE_NULL:
+            yield None, []
+            continue
+        if shape_type != SHAPE_POLYGON:
+            raise ValueError(f"unsupported shape type {shape_type}")
+
+        bbox = struct.unpack_from('<4d', content, 4)
+        num_parts, num_points = struct.unpack_from('<2i', content, 36)
+        parts = np.frombuffer(content, '<i4', num_parts, 44)
+        points = np.frombuffer(content, '<f8', num_points * 2, 44 + 4 * num_parts).reshape(-1, 2)
+        ends = list(parts[1:]) + [num_points]
+        yield bbox, [points[start:end] for start, end in zip(parts, ends)]
+
+
+def iter_dbf(stream, fields=None, encoding='utf-8'):
+    """Yield one dict of attributes per record of a .dbf stream."""
+    header = _read_exact(stream, 32)
+    num_records, header_length, record_length = struct.unpack_from('<IHH', header, 4)
+
+    descriptors = []
+    for _ in range((header_length - 33) // 32):
+        descriptor = _read_exact(stream, 32)
+        name = descriptor[:11].split(b'\0', 1)[0].decode('ascii')
+        descriptors.append((name, chr(descriptor[11]), descriptor[16], descriptor[17]))
+    _read_exact(stream, header_length - 32 - 32 * len(descriptors))
+
+    layout = []
+    offset = 1  # Every record starts with a deletion flag
+    for name, kind, length, decimals in descriptors:
+        if fields is None or name in fields:
+            layout.append((name, kind, decimals, offset, offset + length))
+        offset += length
+
+    for _ in range(num_records):
+        raw = _read_exact(stream, record_length)
+        record = {}
+        for name, kind, decimals, start, end in layout:
+            value = raw[start:end].decode(encoding, 'replace').strip(' \0')
+            if kind in 'NF':
+                if not value:
+                    value = None
+                elif kind == 'F' or decimals:
+                    value = float(value)
+                else:
+                    value = int(value)
+            record[name] = value
+        yield record
+
+
+def read_shapes(path=SHAPEFILE_ZIP, fields=None):
+    """Stream every country of the zipped shapefile as a Shape."""
+    with zipfile.ZipFile(path) as archive:
+        try:
+            encoding = archive.read(f'{SHAPEFILE_NAME}.cpg').decode('ascii').strip() or 'utf-8'
+        except KeyError:
+            encoding = 'latin-1'
+        with archive.open(f'{SHAPEFILE_NAME}.shp') as shp, archive.open(f'{SHAPEFILE_NAME}.dbf') as dbf:
+            for (bbox, rings), record in zip(iter_shp(shp), iter_dbf(dbf, fields, encoding)):
+                if bbox is not None:
+                    yield Shape(record, bbox, rings)
+
+
+def ring_centroid(ring):
+    """Return (area, lon, lat) of a closed ring; area is signed, in square degrees."""
+    x, y = ring[:, 0], ring[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, float(x.mean()), float(y.mean())
+    lon = ((x[:-1] + x[1:]) * cross).sum() / (6 * area)
+    lat = ((y[:-1] + y[1:]) * cross).sum() / (6 * area)
+    return float(area), float(lon), float(lat)
+
+
+def shape_centroid(shape):
+    # Centre of the largest ring, so overseas territories don't pull the point into the sea
+    return max((ring_centroid(ring) for ring in shape.rings), key=lambda c: abs(c[0]))[1:]
+
+
+def country_centroids(names, path=SHAPEFILE_ZIP):
+    """Map game country names to the (lon, lat) centroid of their outline.
+
+    Names without an outline in the shapefile (small islands, mostly) are left out.
+    """
+    wanted = {NAME_ALIASES.get(name, name): name for name in names}
+    centroids = {}
+    for shape in read_shapes(path, set(NAME_FIELDS)):
+        for field in NAME_FIELDS:
+            name = wanted.get(shape.record[field])
+            if name is not None and name not in centroids:
+                centroids[name] = shape_centroid(shape)
+                break
+    return centroids
+
+
+class _Ring:
+    # Edges are kept as arrays so a point test is a handful of vector operations
+    __slots__ = ('bbox', 'x1', 'y1', 'y2', 'slope')
+
+    def __init__(self, points):
+        self.bbox = (*points.min(axis=0), *points.max(axis=0))
+        start, end = points[:-1], points[1:]
+        self.x1, self.y1 = start[:, 0], start[:, 1]
+        self.y2 = end[:, 1]
+        dy = end[:, 1] - start[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.slope = np.where(dy != 0, (end[:, 0] - start[:, 0]) / dy, 0.0)
+
+    def crossings(self, x, y):
+        xmin, ymin, xmax, ymax = self.bbox
+        if not (xmin <= x <= xmax and ymin <= y <= ymax):
+            return 0
+        straddles = (self.y1 > y) != (self.y2 > y)
+        hits = x < self.x1 + (y - self.y1) * self.slope
+        return int(np.count_nonzero(straddles & hits))
+
+
+class ShapeIndex:
+    """Uniform grid over shape bounding boxes with exact point-in-polygon tests."""
+
+    def __init__(self, shapes, cell_size=GRID_CELL_DEGREES):
+        self.shapes = list(shapes)
+        self.cell_size = cell_size
+        self._rings = [[_Ring(ring) for ring in shape.rings] for shape in self.shapes]
+        self._grid = {}
+        for i, shape in enumerate(self.shapes):
+            xmin, ymin, xmax, ymax = shape.bbox
+            for cx in range(self._cell(xmin), self._cell(xmax) + 1):
+                for cy in range(self._cell(ymin), self._cell(ymax) + 1):
+                    self._grid.setdefault((cx, cy), []).append(i)
+
+    def _cell(self, value):
+        return int(value // self.cell_size)
+
+    def candidates(self, x, y):
+        return self._grid.get((self._cell(x), self._cell(y)), [])
+
+    def hit_test(self, x, y):
+        """Return the index of the shape containing (x, y), or None."""
+        for i in self.candidates(x, y):
+            xmin, ymin, xmax, ymax = self.shapes[i].bbox
+            if not (xmin <= x <= xmax and ymin <= y <= ymax):
+                continue
+            # Even-odd rule over every ring, so holes cancel out
+            if sum(ring.crossings(x, y) for ring in self._rings[i]) % 2:
+                return i
+        return None
+
+    def shape_at(self, x, y):
+        i = self.hit_test(x, y)
+        return None if i is None else self.shapes[i]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the country at a longitude/latitude")
+    parser.add_argument('lon', type=float)
+    parser.add_argument('lat', type=float)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = ShapeIndex(read_shapes(fields={'NAME'}))
+    loaded = time.perf_counter() - start
+
+    start = time.perf_counter()
+    shape = index.shape_at(args.lon, args.lat)
+    lookup = time.perf_counter() - start
+
+    print(shape.record['NAME'] if shape else "No country there")
+    print(f"{len(index.shapes)} countries loaded in {loaded * 1000:.1f} ms, lookup took {lookup * 1e6:.0f} us")
+    return 0 if shape else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())